@@ -0,0 +1,276 @@
+"""
+Adaptive noise cancellation driven by a rolling noise-floor estimate.
+
+BVC is one of the most CPU-heavy per-frame costs in the worker, and a learner
+in a quiet room does not need it. In adaptive mode the session's audio input
+is an ``AdaptiveNoiseCancellationInput``: it always reads the raw microphone
+track to estimate the room's background level, and only opens a second,
+BVC-filtered stream of the same track while that level says the room is
+noisy. The estimate is a low percentile of frame levels in dBFS, so it tracks
+the background between words and while the learner is silent, and is not
+moved by how loudly they speak. Hysteresis and a minimum dwell time keep it
+from flapping, and the time spent in each mode is logged when the session
+closes.
+
+Enable with ``ADAPTIVE_NOISE_CANCELLATION=1``; otherwise BVC runs always.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import io
+
+logger = logging.getLogger(__name__)
+
+BVC_MODE = "bvc"
+PASSTHROUGH_MODE = "passthrough"
+
+
+def adaptive_noise_cancellation_enabled() -> bool:
+    return os.getenv("ADAPTIVE_NOISE_CANCELLATION") == "1"
+
+
+class NoiseFloorEstimator:
+    """Estimates the background noise level from frame energies over a rolling window.
+
+    Background noise sits at the bottom of the level distribution whether or
+    not anyone is talking, so the floor is taken as the 10th percentile frame
+    level in dBFS. Stationary noise of any loudness gives a steady estimate.
+    """
+
+    def __init__(self, window_frames: int = 500, update_every: int = 10, percentile: float = 10) -> None:
+        self._levels: Deque[float] = deque(maxlen=window_frames)
+        self._update_every = update_every
+        self._percentile = percentile
+        self._since_update = 0
+        self.noise_floor_dbfs: Optional[float] = None
+
+    def push(self, frame: rtc.AudioFrame) -> Optional[float]:
+        """Add a frame; returns the current floor in dBFS (None until half the window is filled)."""
+        samples = np.frombuffer(frame.data, dtype=np.int16).astype(np.float32)
+        rms = np.sqrt(np.mean(samples * samples)) if samples.size else 0.0
+        self._levels.append(20 * np.log10(rms / 32768.0 + 1e-9))
+
+        self._since_update += 1
+        if self._since_update >= self._update_every and len(self._levels) * 2 >= self._levels.maxlen:
+            self._since_update = 0
+            self.noise_floor_dbfs = float(np.percentile(self._levels, self._percentile))
+        return self.noise_floor_dbfs
+
+
+class NoiseCancellationController:
+    """Hysteresis switch between BVC and passthrough, with time accounting per mode."""
+
+    def __init__(
+        self,
+        enable_above_dbfs: float = -45.0,
+        disable_below_dbfs: float = -52.0,
+        min_dwell_seconds: float = 3.0,
+    ) -> None:
+        """
+        Args:
+            enable_above_dbfs: Noise floor at which BVC is switched on
+            disable_below_dbfs: Noise floor below which BVC is switched off again
+            min_dwell_seconds: Minimum time in a mode before switching
+        """
+        self.enable_above_dbfs = enable_above_dbfs
+        self.disable_below_dbfs = disable_below_dbfs
+        self.min_dwell_seconds = min_dwell_seconds
+        # Start filtered until we have an estimate; a noisy first utterance is worse than wasted CPU
+        self.mode = BVC_MODE
+        self.mode_seconds: Dict[str, float] = {BVC_MODE: 0.0, PASSTHROUGH_MODE: 0.0}
+        self._in_mode_seconds = 0.0
+
+    def update(self, noise_floor_dbfs: Optional[float], frame_seconds: float) -> bool:
+        """Account ``frame_seconds`` to the current mode and switch if needed.
+
+        Returns:
+            True if the mode changed
+        """
+        self.mode_seconds[self.mode] += frame_seconds
+        self._in_mode_seconds += frame_seconds
+        if noise_floor_dbfs is None or self._in_mode_seconds < self.min_dwell_seconds:
+            return False
+
+        if self.mode == BVC_MODE and noise_floor_dbfs < self.disable_below_dbfs:
+            new_mode = PASSTHROUGH_MODE
+        elif self.mode == PASSTHROUGH_MODE and noise_floor_dbfs > self.enable_above_dbfs:
+            new_mode = BVC_MODE
+        else:
+            return False
+        logger.info(
+            "noise cancellation %s -> %s (noise floor %.1f dBFS)", self.mode, new_mode, noise_floor_dbfs
+        )
+        self.mode = new_mode
+        self._in_mode_seconds = 0.0
+        return True
+
+
+class AdaptiveNoiseCancellationInput(io.AudioInput):
+    """Session audio input that applies BVC only while the room's noise floor is high.
+
+    The input outlives any one track: ``set_track`` switches it to a new
+    microphone track, or to waiting for one, without ending the session's audio.
+    """
+
+    def __init__(self, noise_cancellation) -> None:
+        super().__init__(label="AdaptiveNoiseCancellation")
+        self._noise_cancellation = noise_cancellation
+        self._track: Optional[rtc.Track] = None
+        self._raw: Optional[rtc.AudioStream] = None
+        self._filtered: Optional[rtc.AudioStream] = None
+        self._track_changed = asyncio.Event()
+        self._closed = False
+        self.estimator = NoiseFloorEstimator()
+        self.controller = NoiseCancellationController()
+
+    @property
+    def track(self) -> Optional[rtc.Track]:
+        return self._track
+
+    def set_track(self, track: Optional[rtc.Track]) -> None:
+        """Read from ``track``, or wait for a new one if None (e.g. after an unsubscribe)."""
+        if track is self._track:
+            return
+        self._close_streams()
+        self._track = track
+        if track is not None:
+            self._raw = rtc.AudioStream.from_track(track=track)
+            # A new device or room has its own background level
+            self.estimator = NoiseFloorEstimator()
+            self._sync_streams()
+        self._track_changed.set()
+
+    def _close_streams(self) -> None:
+        for stream in (self._raw, self._filtered):
+            if stream is not None:
+                asyncio.ensure_future(stream.aclose())
+        self._raw = None
+        self._filtered = None
+
+    def _sync_streams(self) -> None:
+        if self._track is None:
+            return
+        if self.controller.mode == BVC_MODE and self._filtered is None:
+            self._filtered = rtc.AudioStream.from_track(
+                track=self._track, noise_cancellation=self._noise_cancellation
+            )
+        elif self.controller.mode == PASSTHROUGH_MODE and self._filtered is not None:
+            asyncio.ensure_future(self._filtered.aclose())
+            self._filtered = None
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        while not self._closed:
+            raw = self._raw
+            if raw is None:
+                self._track_changed.clear()
+                await self._track_changed.wait()
+                continue
+
+            # The raw stream is always read, so the estimate keeps tracking the room
+            try:
+                event = await raw.__anext__()
+            except StopAsyncIteration:
+                if raw is self._raw:  # the track ended without an unsubscribe
+                    self.set_track(None)
+                continue
+            frame = event.frame
+            noise_floor_dbfs = self.estimator.push(frame)
+            if self.controller.update(noise_floor_dbfs, frame.duration):
+                self._sync_streams()
+
+            filtered = self._filtered
+            if filtered is None:
+                return frame
+            try:
+                return (await filtered.__anext__()).frame
+            except StopAsyncIteration:
+                continue  # closed by a track or mode switch
+        raise StopAsyncIteration
+
+    async def aclose(self) -> None:
+        self._closed = True
+        self._close_streams()
+        self._track_changed.set()
+        logger.info(
+            "noise cancellation time: %.1fs bvc, %.1fs passthrough",
+            self.controller.mode_seconds[BVC_MODE],
+            self.controller.mode_seconds[PASSTHROUGH_MODE],
+        )
+
+
+# Participants the session listens to, as in RoomIO's default RoomInputOptions
+LINKED_PARTICIPANT_KINDS = (
+    rtc.ParticipantKind.PARTICIPANT_KIND_SIP,
+    rtc.ParticipantKind.PARTICIPANT_KIND_STANDARD,
+)
+
+
+def attach_adaptive_noise_cancellation(
+    session, room: rtc.Room, noise_cancellation
+) -> AdaptiveNoiseCancellationInput:
+    """Feed ``session`` from the linked participant's microphone through adaptive BVC.
+
+    Like ``RoomIO``, the first standard or SIP participant in the room is
+    linked, and when they leave, the next one to join. The input follows the
+    linked participant's microphone across unsubscribes, republishes and
+    reconnects. The session must have been started with room audio input
+    disabled (see ``providers.build_room_input_options``).
+    """
+    adaptive_input = AdaptiveNoiseCancellationInput(noise_cancellation)
+    session.input.audio = adaptive_input
+    linked: Optional[str] = None
+
+    def is_linked_microphone(publication: rtc.RemoteTrackPublication, participant) -> bool:
+        return participant.identity == linked and publication.source == rtc.TrackSource.SOURCE_MICROPHONE
+
+    def link(participant: rtc.RemoteParticipant) -> None:
+        nonlocal linked
+        if linked is not None or participant.kind not in LINKED_PARTICIPANT_KINDS:
+            return
+        linked = participant.identity
+        for publication in participant.track_publications.values():
+            if publication.track is not None and is_linked_microphone(publication, participant):
+                adaptive_input.set_track(publication.track)
+
+    def on_participant_disconnected(participant: rtc.RemoteParticipant) -> None:
+        nonlocal linked
+        if participant.identity != linked:
+            return
+        linked = None
+        adaptive_input.set_track(None)
+        for other in room.remote_participants.values():
+            link(other)
+
+    def on_track_subscribed(track: rtc.Track, publication: rtc.RemoteTrackPublication, participant) -> None:
+        link(participant)
+        if is_linked_microphone(publication, participant):
+            adaptive_input.set_track(track)
+
+    def on_track_unsubscribed(track: rtc.Track, publication: rtc.RemoteTrackPublication, participant) -> None:
+        if track is adaptive_input.track:
+            adaptive_input.set_track(None)
+
+    handlers = {
+        "participant_connected": link,
+        "participant_disconnected": on_participant_disconnected,
+        "track_subscribed": on_track_subscribed,
+        "track_unsubscribed": on_track_unsubscribed,
+    }
+
+    def on_close(ev) -> None:
+        for event, handler in handlers.items():
+            room.off(event, handler)
+        asyncio.ensure_future(adaptive_input.aclose())
+
+    for event, handler in handlers.items():
+        room.on(event, handler)
+    session.on("close", on_close)
+    for participant in room.remote_participants.values():
+        link(participant)
+    return adaptive_input
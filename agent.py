@@ -1,43 +1,44 @@
+import os
 from dotenv import load_dotenv
 from livekit.agents import Agent, ChatContext, AgentSession, function_tool, RunContext, BackgroundAudioPlayer
 from livekit import agents
-from livekit.agents import RoomInputOptions
-from livekit.plugins import (
-    openai,
-    google,
-    deepgram,
-    noise_cancellation,
-    silero,
-)
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
-from agents import NativeExplainAgent, ListenAgent
 from typing import Any, Optional
-from prompts.loader import load_prompt
+from prompts.assembly import stable_instructions
+import providers
+from provider_router import get_router
+from usage_metering import get_aggregator
+from vad_gate import VADGatedSTTMixin
+from session_store import RESUME_INSTRUCTIONS, SessionCheckpointer, finish_session, get_store
+from event_log import get_event_log
 
 load_dotenv()
 
-class HostAgent(Agent):
+class HostAgent(VADGatedSTTMixin, Agent):
     def __init__(self, chat_ctx: Optional[ChatContext] = None) -> None:
         super().__init__(
             chat_ctx=chat_ctx or ChatContext(),
-            instructions=load_prompt('host'),
-            stt=deepgram.STT(model="nova-3", language="multi"),
-            llm=openai.LLM(model="gpt-4o-mini"),
-            # Google TTS with Spanish voice - see https://docs.livekit.io/agents/integrations/tts/google/
-            tts=google.TTS(
-                language="es-US",
-                voice_name="es-US-Chirp3-HD-Puck"
-            ),
-            vad=silero.VAD.load(),
-            turn_detection=MultilingualModel(),
+            instructions=stable_instructions('host'),
+            # Models and voices follow the worker's current load tier
+            **providers.build_pipeline(),
         )
 
+    async def on_enter(self) -> None:
+        """Hook called when this agent becomes active; picks up a resumed session."""
+        if self.session.userdata.consume_resumed():
+            await self.session.generate_reply(instructions=RESUME_INSTRUCTIONS)
+
+    async def on_exit(self) -> None:
+        """Hook called when this agent hands off; returns pooled provider clients."""
+        providers.release(self)
+
     @function_tool()
     async def start_native_explain(
         self,
         context: RunContext,
     ) -> Agent:
         """Start the native explanation session."""
+        from agents import NativeExplainAgent
+
         await context.session.say("Let's start the native explanation session!")
         return NativeExplainAgent()
 
@@ -48,6 +49,8 @@ class HostAgent(Agent):
         context: RunContext,
     ) -> Agent:
         """Start the listening session."""
+        from agents import ListenAgent
+
         await context.session.say("Let's start the listening session!")
         return ListenAgent()
 
@@ -57,39 +60,94 @@ class HostAgent(Agent):
         context: RunContext,
     ) -> None:
         """Stop the quiz session and end the conversation."""
+        # The learner quit, so a later job in this room must not resume it
+        finish_session(context.session)
         await context.session.say(
             instructions="Thank you and goodbye"
         )
         await context.session.stop()
 
 
+# Agents a checkpoint can resume into; sub-agents are only imported when needed
+RESUMABLE_AGENTS = ("HostAgent", "NativeExplainAgent", "ListenAgent")
+
+
+def resume_agent(checkpoint) -> Agent:
+    """Rebuild the checkpointed agent with its compacted chat history."""
+    if checkpoint.agent == "HostAgent":
+        return HostAgent(chat_ctx=checkpoint.chat_ctx())
+    import importlib
+    agent_cls = getattr(importlib.import_module("agents"), checkpoint.agent)
+    return agent_cls(chat_ctx=checkpoint.chat_ctx())
+
+
 async def entrypoint(ctx: agents.JobContext):
-    session = AgentSession()
+    if os.getenv("LANGFUSE_PUBLIC_KEY"):
+        # Langfuse is optional here; when configured, usage is exported through it
+        from langfuse_setup import setup_langfuse
+        get_aggregator().set_tracer_provider(setup_langfuse())
+    
+    from agents.native_explain_agent import MySessionInfo
+    from scheduler import get_scheduler, load_learner
+
+    # A room with a checkpoint was interrupted mid-exercise (deploy, crash); resume it
+    store = get_store()
+    checkpoint = await store.load(ctx.room.name)
+    if checkpoint is not None and checkpoint.agent not in RESUMABLE_AGENTS:
+        checkpoint = None
+
+    user_name = "Lilian Chavez"
+    await load_learner(user_name)  # review history from earlier sessions, for next_item and record
+    if checkpoint is not None:
+        userdata = MySessionInfo.from_dict(checkpoint.userdata)
+        userdata.resumed = True
+    else:
+        # The native explanation exercise teaches whichever item the learner has due next
+        userdata = MySessionInfo(
+            user_name=user_name,
+            target_lexical_item=get_scheduler().next_item(user_name),
+        )
+    session = AgentSession(userdata=userdata)
+    
+    # Feed provider latency and errors into the failover ranking
+    get_router().attach(session)
+    get_aggregator().attach(session, session_id=ctx.room.name)
+    SessionCheckpointer(session, store, key=ctx.room.name)
     
     # Create the background audio player
     background_audio = BackgroundAudioPlayer()
     
-    initial_ctx = ChatContext()
-    initial_ctx.add_message(role="assistant", content="The user's name is Lilian Chavez")
+    if checkpoint is not None:
+        agent = resume_agent(checkpoint)
+    else:
+        initial_ctx = ChatContext()
+        initial_ctx.add_message(role="assistant", content=f"The user's name is {user_name}")
+        agent = HostAgent(chat_ctx=initial_ctx)
 
     await session.start(
         room=ctx.room,
-        agent=HostAgent(chat_ctx=initial_ctx),
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
+        agent=agent,
+        room_input_options=providers.build_room_input_options(),
     )
 
     await ctx.connect()
     
+    # In adaptive mode, BVC is switched on and off from the measured noise floor
+    providers.attach_noise_cancellation(session, ctx.room)
+    
+    # Write out queued event records and the last usage interval before the job exits
+    ctx.add_shutdown_callback(get_event_log().flush)
+    ctx.add_shutdown_callback(get_aggregator().shutdown)
+    
     # Start the background audio player
     await background_audio.start(room=ctx.room, agent_session=session)
     
     # Store the background_audio player in the session for access by other agents
     session.background_audio = background_audio
 
-    await session.say("Welcome to Vocab Voice. Say A for native explanation or C for listening practice")
+    if checkpoint is None:
+        await session.say("Welcome to Vocab Voice. Say A for native explanation or C for listening practice")
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=providers.prewarm))
\ No newline at end of file
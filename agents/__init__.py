@@ -1,4 +1,19 @@
-from .native_explain_agent import NativeExplainAgent
-from .listening_agent import ListenAgent
+import importlib
 
-__all__ = ['NativeExplainAgent', 'ListenAgent']
\ No newline at end of file
+__all__ = ['NativeExplainAgent', 'ListenAgent']
+
+# Sub-agents are imported on first access so that importing the package
+# (e.g. from agent.py at worker start) does not load either agent module.
+_LAZY_IMPORTS = {
+    'NativeExplainAgent': '.native_explain_agent',
+    'ListenAgent': '.listening_agent',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,37 +4,42 @@ from typing import Optional
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from prompts.loader import load_prompt
-from livekit.plugins import (
-    openai,
-    google,
-    deepgram,
-    silero,
-)
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from prompts.assembly import add_session_context, stable_instructions
+import providers
+from provider_router import get_router
+import dialogue_assets
+from vad_gate import VADGatedSTTMixin
+from session_store import RESUME_INSTRUCTIONS
 import asyncio
-from mutagen.mp3 import MP3
 
 load_dotenv()
 
-class ListenAgent(Agent):
-    def __init__(self, chat_ctx: Optional[ChatContext] = None) -> None:
+class ListenAgent(VADGatedSTTMixin, Agent):
+    def __init__(self, chat_ctx: Optional[ChatContext] = None, dialogue_path: str = './audios/crap_out') -> None:
+        # Dialogue asset path without extension; see dialogue_assets.find_dialogue_asset
+        self._dialogue_path = dialogue_path
+        # Once a live dialogue has played, the replay tools serve it instead of the asset
+        self._live_dialogue = None
         super().__init__(
             chat_ctx=chat_ctx or ChatContext(),
-            instructions=load_prompt('listening'),
-            stt=deepgram.STT(model="nova-3", language="multi"),
-            llm=openai.LLM(model="gpt-4o-mini"),
-            # Google TTS with Spanish voice - see https://docs.livekit.io/agents/integrations/tts/google/
-            tts=google.TTS(
-                language="es-US",
-                voice_name="es-US-Chirp3-HD-Puck"
-            ),
-            vad=silero.VAD.load(),
-            turn_detection=MultilingualModel(),
+            instructions=stable_instructions('listening'),
+            # Models and voices follow the worker's current load tier
+            **providers.build_pipeline(),
         )
 
+    async def on_exit(self) -> None:
+        """Hook called when this agent hands off; returns pooled provider clients."""
+        providers.release(self)
+
     async def on_enter(self) -> None:
         """Hook called when this agent becomes active."""
+        try:
+            resumed = self.session.userdata.consume_resumed()
+        except ValueError:
+            resumed = False
+        if resumed:
+            await self.session.generate_reply(instructions=RESUME_INSTRUCTIONS)
+            return
         await self.session.generate_reply(
             instructions=(
                 "Greet the user in their native language extremely quickly, and ask very "
@@ -49,20 +54,28 @@ class ListenAgent(Agent):
         self,
         context: RunContext,
     ) -> None:
-        """Play the dialogue audio and ask for comprehension."""
+        """Play the dialogue audio and ask for comprehension.
+        Replays the live dialogue instead if one has already been played."""
         # Announce that we're about to play the dialogue
         await context.session.say(text="Hello world!Playing the dialogue now")
         
-        # Get audio file duration
-        audio_path = './audios/crap_out.mp3'
-        audio = MP3(audio_path)
-        duration = audio.info.length  # Duration in seconds
+        if self._live_dialogue is not None:
+            duration = self._live_dialogue.duration
+            source = self._live_dialogue.replay()
+        else:
+            # Prefer a 48 kHz PCM asset, which is streamed as-is with no decoding or resampling
+            audio_path = dialogue_assets.find_dialogue_asset(self._dialogue_path)
+            duration = dialogue_assets.audio_duration(audio_path)  # Duration in seconds
+            if audio_path.endswith('.pcm'):
+                source = dialogue_assets.pcm_frames(audio_path)
+            else:
+                source = audio_path
         
         # Create task for sleeping during audio playback
         sleep_task = asyncio.create_task(asyncio.sleep(duration))
         
-        # Play the audio file using background audio player with AudioConfig
-        audio_config = AudioConfig(audio_path, volume=1.0)
+        # Play the audio using background audio player with AudioConfig
+        audio_config = AudioConfig(source, volume=1.0)
         await context.session.background_audio.play(audio_config)
         
         
@@ -74,6 +87,72 @@ class ListenAgent(Agent):
             instructions="Ask the user to explain what was happening in the dialogue, focusing on the target word/phrase."
         )
 
+    @function_tool()
+    async def play_live_dialogue(
+        self,
+        context: RunContext,
+    ) -> None:
+        """Generate a brand new dialogue for the target word/phrase and play it as it is generated.
+        Use this instead of play_dialogue when the user wants a new or different dialogue."""
+        from live_dialogue import LiveDialogue
+        from usage_metering import get_aggregator
+
+        dialogue = LiveDialogue(
+            self._target_phrase(), llm=self.llm, meter=get_aggregator().meter_for(context.session)
+        )
+        # Audio starts as soon as the first turn is synthesized; later turns are generated during playback
+        handle = context.session.background_audio.play(AudioConfig(dialogue.frames(), volume=1.0))
+        await handle.wait_for_playout()
+        self._live_dialogue = dialogue
+
+        transcript = "\n".join(f"{turn['speaker']}: {turn['text']}" for turn in dialogue.turns)
+        await add_session_context(self, f"The dialogue the user just heard was:\n{transcript}")
+        await context.session.generate_reply(
+            instructions="Ask the user to explain what was happening in the dialogue, focusing on the target word/phrase."
+        )
+
+    def _target_phrase(self) -> str:
+        """The session's target phrase, or the one the pre-rendered dialogue was made for."""
+        try:
+            target_item = getattr(self.session.userdata, 'target_lexical_item', None)
+        except ValueError:  # the session was started without userdata
+            target_item = None
+        if target_item is not None:
+            return target_item.phrase
+        return os.path.basename(self._dialogue_path).replace('_', ' ')
+
+    @function_tool()
+    async def replay_target_segment(
+        self,
+        context: RunContext,
+    ) -> str:
+        """Replay only the part of the dialogue that contains the target word/phrase.
+        Use this when the user misunderstood the target word/phrase, instead of replaying the whole dialogue."""
+        live = self._live_dialogue
+        if live is not None:
+            alignment = live.alignment
+        else:
+            audio_path = dialogue_assets.find_dialogue_asset(self._dialogue_path)
+            alignment = dialogue_assets.load_alignment(audio_path)
+        segment = dialogue_assets.find_target_segment(alignment) if alignment else None
+        if segment is None:
+            return "No timing data is available for this dialogue; use play_dialogue to replay it."
+
+        # Pad slightly so the segment does not start or end mid-syllable
+        start = max(0.0, segment[0] - 0.15)
+        end = segment[1] + 0.15
+
+        sleep_task = asyncio.create_task(asyncio.sleep(end - start))
+        if live is not None:
+            frames = live.replay(start, end)
+        else:
+            frames = dialogue_assets.segment_frames(audio_path, start, end)
+        audio_config = AudioConfig(frames, volume=1.0)
+        await context.session.background_audio.play(audio_config)
+        await sleep_task
+
+        return f"Replayed the segment containing '{alignment['target_word']}'. Ask the user what they think it means now."
+
     @function_tool()
     async def provide_feedback(
         self,
@@ -94,11 +173,14 @@ class ListenAgent(Agent):
 async def entrypoint(ctx):
     from livekit.agents import AgentSession, BackgroundAudioPlayer
     from livekit import agents
-    from livekit.agents import RoomInputOptions
-    from livekit.plugins import noise_cancellation
+    from usage_metering import get_aggregator
     
     session = AgentSession()
     
+    # Feed provider latency and errors into the failover ranking
+    get_router().attach(session)
+    get_aggregator().attach(session, session_id=ctx.room.name)
+    
     # Create the background audio player
     background_audio = BackgroundAudioPlayer()
     
@@ -108,13 +190,17 @@ async def entrypoint(ctx):
     await session.start(
         room=ctx.room,
         agent=ListenAgent(chat_ctx=initial_ctx),
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
+        room_input_options=providers.build_room_input_options(),
     )
 
     await ctx.connect()
     
+    # In adaptive mode, BVC is switched on and off from the measured noise floor
+    providers.attach_noise_cancellation(session, ctx.room)
+    
+    # Export the last usage interval before the job exits
+    ctx.add_shutdown_callback(get_aggregator().shutdown)
+    
     # Start the background audio player
     await background_audio.start(room=ctx.room, agent_session=session)
     
@@ -124,4 +210,4 @@ async def entrypoint(ctx):
 
 if __name__ == "__main__":
     from livekit import agents
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=providers.prewarm))
\ No newline at end of file
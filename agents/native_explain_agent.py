@@ -7,89 +7,47 @@ from livekit.agents import Agent, ChatContext, function_tool
 from typing import Optional
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from prompts.loader import load_prompt
-from langfuse_setup import setup_langfuse
-from livekit.plugins import (
-    google,
-    deepgram,
-    silero,
-    openai,
-)
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from prompts.assembly import add_session_context, render_target_item, stable_instructions
+import providers
+from provider_router import get_router
+from vad_gate import VADGatedSTTMixin
 from livekit.agents import AgentSession
+from lexicon import LexicalSense, TargetLexicalItem
+from scheduler import get_scheduler, load_learner, save_learner
+from session_store import RESUME_INSTRUCTIONS, finish_session
+from event_log import get_event_log
 from dataclasses import dataclass
-from typing import List, Dict, Any
-
-@dataclass
-class LexicalSense:
-    """Represents one meaning/sense of a lexical item"""
-    sense_number: int
-    definition: str
-    examples: List[str]
-    explained: bool = False  # Track if user has explained this sense
-
-@dataclass
-class TargetLexicalItem:
-    """Represents a multi-sense lexical item"""
-    phrase: str
-    senses: List[LexicalSense]
-    
-    @property
-    def total_senses(self) -> int:
-        return len(self.senses)
-    
-    @property
-    def explained_senses(self) -> List[LexicalSense]:
-        return [sense for sense in self.senses if sense.explained]
-    
-    @property
-    def remaining_senses(self) -> List[LexicalSense]:
-        return [sense for sense in self.senses if not sense.explained]
-    
-    @property
-    def all_explained(self) -> bool:
-        return len(self.explained_senses) == self.total_senses
-    
-    def mark_sense_explained(self, sense_number: int) -> bool:
-        """Mark a sense as explained. Returns True if found and marked."""
-        for sense in self.senses:
-            if sense.sense_number == sense_number:
-                sense.explained = True
-                return True
-        return False
 
 @dataclass
 class MySessionInfo:
     user_name: str | None = None
     age: int | None = None
     target_lexical_item: TargetLexicalItem | None = None
+    resumed: bool = False  # Restored from a checkpoint; cleared by the first agent to enter
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MySessionInfo":
+        """Rebuild from ``dataclasses.asdict`` output, e.g. a session checkpoint."""
+        item = data.get("target_lexical_item")
+        return cls(
+            user_name=data.get("user_name"),
+            age=data.get("age"),
+            target_lexical_item=TargetLexicalItem(
+                phrase=item["phrase"],
+                senses=[LexicalSense(**sense) for sense in item["senses"]],
+            ) if item else None,
+        )
+
+    def consume_resumed(self) -> bool:
+        """True once after a resume, so only the first agent to enter picks up where it left off."""
+        resumed, self.resumed = self.resumed, False
+        return resumed
 
 # Load environment variables from .env file
 load_dotenv()
 
-def create_target_lexical_item(phrase: str, senses_data: List[Dict[str, Any]]) -> TargetLexicalItem:
-    """Helper function to create a TargetLexicalItem from dictionary data.
-    
-    Args:
-        phrase: The lexical item phrase (e.g., "SETTLE DOWN")
-        senses_data: List of dictionaries with keys: senseNumber, definition, examples
-    
-    Returns:
-        TargetLexicalItem instance
-    """
-    senses = []
-    for sense_dict in senses_data:
-        sense = LexicalSense(
-            sense_number=sense_dict["senseNumber"],
-            definition=sense_dict["definition"],
-            examples=sense_dict["examples"]
-        )
-        senses.append(sense)
-    
-    return TargetLexicalItem(phrase=phrase, senses=senses)
 
-
-class NativeExplainAgent(Agent):
+class NativeExplainAgent(VADGatedSTTMixin, Agent):
     """
     Language learning agent that guides users through explaining L2 vocabulary 
     meanings in their native language. Manages multi-sense lexical items and 
@@ -106,29 +64,21 @@ class NativeExplainAgent(Agent):
         """
         self._room_name = room_name
         
-        # Configure multilingual speech-to-text using Deepgram Nova-3
-        stt = deepgram.STT(model="nova-3", language="multi")
-        
-        # Configure Spanish text-to-speech using Google Cloud TTS
-        tts = google.TTS(
-            language="es-US",
-            voice_name="es-US-Chirp3-HD-Puck"
-        )
-        
-        # Configure language model for conversation management
-        llm=openai.LLM(model="gpt-4o-mini")
-        
-        # Initialize parent Agent with all components
+        # Initialize parent Agent with speech and language components for the
+        # worker's current load tier (STT, LLM, TTS, VAD and turn detection)
         super().__init__(
             chat_ctx=chat_ctx or ChatContext(),
-            instructions=load_prompt('native_explain'),
-            llm=llm,
-            stt=stt,
-            tts=tts,
-            vad=silero.VAD.load(),  # Voice Activity Detection
-            turn_detection=MultilingualModel()  # Turn detection for conversation flow
+            instructions=stable_instructions('native_explain'),
+            **providers.build_pipeline()
         )
 
+    async def on_exit(self) -> None:
+        """
+        Agent teardown hook called when this agent hands off or the session ends.
+        Returns the pooled speech and language clients to the worker pool.
+        """
+        providers.release(self)
+
         
 
     @function_tool()
@@ -144,7 +94,7 @@ class NativeExplainAgent(Agent):
         Returns:
             Appropriate response message based on completion status
         """
-        print(f"✅ Tool executed: correct_sense_explained for sense {sense_number}")
+        get_event_log().emit("tool_executed", agent=self, tool="correct_sense_explained", sense_number=sense_number)
         
         # Get session data containing the target lexical item
         session_info = self.session.userdata
@@ -154,10 +104,18 @@ class NativeExplainAgent(Agent):
         # Mark this sense as explained and update progress
         target_item = session_info.target_lexical_item
         if target_item.mark_sense_explained(sense_number):
-            print(f"✅ Marked sense {sense_number} as explained")
+            get_event_log().emit(
+                "sense_explained", agent=self, tool="correct_sense_explained",
+                phrase=target_item.phrase, sense_number=sense_number,
+            )
+            
+            # Push this sense's next review further out
+            get_scheduler().record(session_info.user_name, target_item.phrase, sense_number, correct=True)
+            await save_learner(session_info.user_name)
             
             # Check if all senses are now explained (session complete)
             if target_item.all_explained:
+                finish_session(self.session)  # nothing left to resume
                 return f"{congratulation_message} ¡Excelente! Has explicado todos los significados de '{target_item.phrase}'. ¡Sesión completada!"
             else:
                 # Prompt for remaining senses
@@ -179,7 +137,17 @@ class NativeExplainAgent(Agent):
         Returns:
             Formatted message ending the session
         """
-        print("❌ Tool executed: wrong_answer")
+        get_event_log().emit("tool_executed", agent=self, tool="wrong_answer")
+        
+        # Bring every sense the learner could not explain back up for review soon
+        session_info = self.session.userdata
+        if session_info and session_info.target_lexical_item:
+            target_item = session_info.target_lexical_item
+            for sense in target_item.remaining_senses:
+                get_scheduler().record(session_info.user_name, target_item.phrase, sense.sense_number, correct=False)
+            await save_learner(session_info.user_name)
+        
+        finish_session(self.session)  # the exercise ends here, so don't resume it
         return f"{explanation_message} La sesión ha terminado."
     
     @function_tool()
@@ -194,35 +162,30 @@ class NativeExplainAgent(Agent):
         Returns:
             Formatted completion message
         """
-        print("🎉 Tool executed: all_senses_completed")
+        get_event_log().emit("tool_executed", agent=self, tool="all_senses_completed")
+        finish_session(self.session)
         return f"{final_congratulation} ¡Has completado exitosamente la explicación de todos los significados!"
         
     async def on_enter(self) -> None:
         """
         Agent initialization hook called when this agent becomes active.
-        Sets up the learning session with target lexical item and generates initial instructions.
+        Adds the target lexical item to the chat history and asks for the first explanation.
         """
-        print("NativeExplainAgent on_enter")
+        get_event_log().emit("agent_entered", agent=self)
         
         # Get the target lexical item from session data
         session_info = self.session.userdata
         if session_info and session_info.target_lexical_item:
             target_item = session_info.target_lexical_item
             
-            # Build dynamic instructions based on the target lexical item
-            instructions = f"""The TARGET LEXICAL ITEM IS '{target_item.phrase}'. This phrasal verb has {target_item.total_senses} different meanings. 
-
-Ask the user to explain what this phrasal verb means. When they explain a meaning, determine which of the {target_item.total_senses} senses they are explaining and whether it's correct.
-
-The {target_item.total_senses} senses are:
-"""
-            # Add each sense definition and example
-            for sense in target_item.senses:
-                instructions += f"{sense.sense_number}. {sense.definition} (Example: {sense.examples[0]})\n"
-            
-            instructions += f"\nStart by asking them to explain what '{target_item.phrase}' means."
-            
-            await self.session.generate_reply(instructions=instructions)
+            # Item details go into the chat history so the instructions stay identical across sessions
+            await add_session_context(self, render_target_item(target_item))
+            if session_info.consume_resumed():
+                await self.session.generate_reply(instructions=RESUME_INSTRUCTIONS)
+                return
+            await self.session.generate_reply(
+                instructions="Start by asking them to explain what the TARGET LEXICAL ITEM means."
+            )
         else:
             # Fallback if no target item is set in session data
             await self.session.generate_reply(
@@ -232,31 +195,17 @@ The {target_item.total_senses} senses are:
 
 
 async def entrypoint(ctx):
-    setup_langfuse()  # set up the langfuse tracer provider
+    from langfuse_setup import setup_langfuse
+    from usage_metering import get_aggregator
+    trace_provider = setup_langfuse()  # set up the langfuse tracer provider
+    get_aggregator().set_tracer_provider(trace_provider)  # export usage through it too
     
     from livekit.agents import AgentSession
     from livekit import agents
-    from livekit.agents import RoomInputOptions
-    from livekit.plugins import noise_cancellation
-    
-    settle_down_data = [
-        {
-            "senseNumber": 1,
-            "definition": "Adopt a quieter and steadier lifestyle",
-            "examples": [
-                "I just want to fall in love with the right guy and settle down."
-            ]
-        },
-        {
-            "senseNumber": 2,
-            "definition": "Become calmer, quieter, more orderly",
-            "examples": [
-                "We need things to settle down before we can make a serious decision."
-            ]
-        }
-    ]
     
-    target_item = create_target_lexical_item("SETTLE DOWN", settle_down_data)
+    # Pick the learner's next due item instead of always teaching the same one
+    await load_learner("Max")
+    target_item = get_scheduler().next_item("Max")
     
     session = AgentSession(userdata=MySessionInfo(
         user_name="Max", 
@@ -264,20 +213,29 @@ async def entrypoint(ctx):
         target_lexical_item=target_item
     ))
     
+    # Feed provider latency and errors into the failover ranking
+    get_router().attach(session)
+    get_aggregator().attach(session, session_id=ctx.room.name)
+    
     initial_ctx = ChatContext()
     initial_ctx.add_message(role="assistant", content="The user's name is Max")
 
     await session.start(
         room=ctx.room,
         agent=NativeExplainAgent(chat_ctx=initial_ctx, room_name=ctx.room.name),
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
+        room_input_options=providers.build_room_input_options(),
     )
 
     await ctx.connect()
+    
+    # In adaptive mode, BVC is switched on and off from the measured noise floor
+    providers.attach_noise_cancellation(session, ctx.room)
+    
+    # Write out queued event records and the last usage interval before the job exits
+    ctx.add_shutdown_callback(get_event_log().flush)
+    ctx.add_shutdown_callback(get_aggregator().shutdown)
 
 
 if __name__ == "__main__":
     from livekit import agents
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=providers.prewarm))
\ No newline at end of file
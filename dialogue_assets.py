@@ -0,0 +1,238 @@
+"""
+Dialogue audio assets in the LiveKit room's native playback format.
+
+Rooms play 48 kHz mono audio in 20 ms Opus frames. Assets written by
+``dialogue_generator.py`` in ``pcm`` mode are raw 16-bit little-endian PCM at
+that rate, padded to a whole number of 20 ms frames, so they can be pushed to
+the room as ``rtc.AudioFrame`` objects without decoding or resampling.
+
+Every asset also has a ``.json`` alignment sidecar with turn offsets and
+character and word timestamps, used to replay just the segment that contains
+the target word.
+"""
+
+import asyncio
+import contextlib
+import json
+import math
+import os
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from livekit import rtc
+
+SAMPLE_RATE = 48000
+NUM_CHANNELS = 1
+SAMPLE_WIDTH = 2  # bytes, signed 16-bit
+FRAME_DURATION_MS = 20
+SAMPLES_PER_FRAME = SAMPLE_RATE * FRAME_DURATION_MS // 1000
+BYTES_PER_FRAME = SAMPLES_PER_FRAME * NUM_CHANNELS * SAMPLE_WIDTH
+
+# Preferred asset extensions, cheapest to play first
+ASSET_EXTENSIONS = ("pcm", "ogg", "mp3")
+
+
+def find_dialogue_asset(base_path: str) -> str:
+    """Return the cheapest-to-play asset for ``base_path`` (path without extension).
+
+    Raises:
+        FileNotFoundError: If no asset exists in any supported format
+    """
+    for extension in ASSET_EXTENSIONS:
+        path = f"{base_path}.{extension}"
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No dialogue asset found for: {base_path}")
+
+
+def pad_to_frame_boundary(path: str) -> None:
+    """Append silence to a raw PCM file so it holds a whole number of frames."""
+    remainder = os.path.getsize(path) % BYTES_PER_FRAME
+    if remainder:
+        with open(path, "ab") as f:
+            f.write(b"\x00" * (BYTES_PER_FRAME - remainder))
+
+
+def audio_duration(path: str) -> float:
+    """Duration of a dialogue asset in seconds."""
+    if path.endswith(".pcm"):
+        return os.path.getsize(path) / (SAMPLE_RATE * NUM_CHANNELS * SAMPLE_WIDTH)
+    if path.endswith(".ogg"):
+        from mutagen.oggopus import OggOpus
+        return OggOpus(path).info.length
+    from mutagen.mp3 import MP3
+    return MP3(path).info.length
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def pcm_frames(
+    path: str, start: float = 0.0, end: Optional[float] = None
+) -> AsyncIterator[rtc.AudioFrame]:
+    """Yield 20 ms audio frames from a raw PCM asset, optionally between two offsets.
+
+    Args:
+        path: Path to a ``.pcm`` asset written in pcm mode
+        start: Offset in seconds of the first frame to yield
+        end: Offset in seconds to stop at (None plays to the end)
+    """
+    data = await asyncio.to_thread(_read_bytes, path)
+    first = math.floor(start * 1000 / FRAME_DURATION_MS) * BYTES_PER_FRAME
+    last = len(data)
+    if end is not None:
+        last = min(last, math.ceil(end * 1000 / FRAME_DURATION_MS) * BYTES_PER_FRAME)
+
+    view = memoryview(data)
+    for offset in range(first, last, BYTES_PER_FRAME):
+        chunk = view[offset:offset + BYTES_PER_FRAME]
+        if len(chunk) < BYTES_PER_FRAME:
+            # Unpadded file; pad the final frame with silence
+            chunk = bytes(chunk) + b"\x00" * (BYTES_PER_FRAME - len(chunk))
+        yield rtc.AudioFrame(
+            data=chunk,
+            sample_rate=SAMPLE_RATE,
+            num_channels=NUM_CHANNELS,
+            samples_per_channel=SAMPLES_PER_FRAME,
+        )
+
+
+def silence_frames(duration: float) -> List[rtc.AudioFrame]:
+    """Frames of silence lasting ``duration`` seconds, rounded up to whole frames."""
+    count = math.ceil(duration * 1000 / FRAME_DURATION_MS)
+    return [
+        rtc.AudioFrame(
+            data=b"\x00" * BYTES_PER_FRAME,
+            sample_rate=SAMPLE_RATE,
+            num_channels=NUM_CHANNELS,
+            samples_per_channel=SAMPLES_PER_FRAME,
+        )
+        for _ in range(count)
+    ]
+
+
+async def segment_frames(path: str, start: float, end: float) -> AsyncIterator[rtc.AudioFrame]:
+    """Yield 48 kHz frames for ``[start, end)`` seconds of any dialogue asset.
+
+    PCM assets are sliced directly; other formats are decoded and trimmed.
+    """
+    if path.endswith(".pcm"):
+        async for frame in pcm_frames(path, start, end):
+            yield frame
+        return
+
+    from livekit.agents.utils.audio import audio_frames_from_file
+
+    position = 0.0
+    # Close the decoder as soon as the segment ends instead of leaving it to GC
+    decoded = audio_frames_from_file(path, sample_rate=SAMPLE_RATE, num_channels=NUM_CHANNELS)
+    async with contextlib.aclosing(decoded) as frames:
+        async for frame in frames:
+            frame_end = position + frame.duration
+            if frame_end > start:
+                yield frame
+            position = frame_end
+            if position >= end:
+                break
+
+
+def _alignment_path(audio_path: str) -> str:
+    return os.path.splitext(audio_path)[0] + ".json"
+
+
+def estimate_char_alignment(text: str, duration: float) -> Dict[str, List]:
+    """Spread characters evenly over a turn when the TTS returned no timestamps."""
+    step = duration / max(len(text), 1)
+    return {
+        "characters": list(text),
+        "character_start_times_seconds": [i * step for i in range(len(text))],
+        "character_end_times_seconds": [(i + 1) * step for i in range(len(text))],
+    }
+
+
+def words_from_characters(chars: List[str], starts: List[float], ends: List[float]) -> List[Dict[str, Any]]:
+    """Group character timestamps into whitespace-separated words."""
+    words = []
+    current = None
+    for char, start, end in zip(chars, starts, ends):
+        if char.isspace():
+            current = None
+            continue
+        if current is None:
+            current = {"word": "", "start": start, "end": end}
+            words.append(current)
+        current["word"] += char
+        current["end"] = end
+    return words
+
+
+def build_turn_alignment(
+    turn: Dict[str, str], start: float, duration: float, char_alignment: Optional[Dict[str, List]]
+) -> Dict[str, Any]:
+    """Alignment record for one turn, with timestamps relative to the whole dialogue.
+
+    Args:
+        turn: Dialogue turn with 'speaker' and 'text' keys
+        start: Offset of the turn in the combined audio, in seconds
+        duration: Length of the turn's audio, in seconds
+        char_alignment: Provider character timestamps relative to the turn, or None
+    """
+    if not char_alignment:
+        char_alignment = estimate_char_alignment(turn["text"], duration)
+    chars = char_alignment["characters"]
+    starts = [start + t for t in char_alignment["character_start_times_seconds"]]
+    ends = [start + t for t in char_alignment["character_end_times_seconds"]]
+    return {
+        "speaker": turn["speaker"],
+        "text": turn["text"],
+        "start": start,
+        "end": start + duration,
+        "words": words_from_characters(chars, starts, ends),
+        "characters": {"chars": chars, "start": starts, "end": ends},
+    }
+
+
+def save_alignment(audio_path: str, target_word: str, turns: List[Dict[str, Any]]) -> str:
+    """Write the alignment sidecar for ``audio_path`` and return its path."""
+    path = _alignment_path(audio_path)
+    with open(path, "w") as f:
+        json.dump({"target_word": target_word, "turns": turns}, f, ensure_ascii=False)
+    return path
+
+
+def load_alignment(audio_path: str) -> Optional[Dict[str, Any]]:
+    """Load the alignment sidecar for ``audio_path``, or None if it was never generated."""
+    path = _alignment_path(audio_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def find_target_segment(alignment: Dict[str, Any], target: Optional[str] = None) -> Optional[Tuple[float, float]]:
+    """Find the (start, end) offsets of the turn containing the target phrase.
+
+    Words are matched by prefix so inflected forms ("crapped out") still match
+    the base phrase ("crap out"). Falls back to the first word of the phrase.
+
+    Returns:
+        Offsets in seconds, or None if the phrase does not occur
+    """
+    tokens = [_normalize(t) for t in (target or alignment["target_word"]).split()]
+    tokens = [t for t in tokens if t]
+    if not tokens:
+        return None
+
+    for match_len in (len(tokens), 1):
+        for turn in alignment["turns"]:
+            words = [_normalize(w["word"]) for w in turn["words"]]
+            for i in range(len(words) - match_len + 1):
+                if all(words[i + j].startswith(tokens[j]) for j in range(match_len)):
+                    return turn["start"], turn["end"]
+    return None
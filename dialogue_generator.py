@@ -1,12 +1,20 @@
 import os
 import json
+import base64
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import openai
 import requests
 from dotenv import load_dotenv
+import io
 import tempfile
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from mutagen.mp3 import MP3
+import dialogue_assets
+import tts_models
+from tts_models import VOICE_IDS
+from prompts.loader import load_prompt
 
 # Load environment variables
 load_dotenv()
@@ -16,10 +24,31 @@ openai_client = openai.OpenAI(
     api_key=os.getenv("OPENAI_API_KEY")
 )
 
-# Voice IDs for two different speakers
-VOICE_IDS = {
-    "A": "21m00Tcm4TlvDq8ikWAM",  # Replace with your preferred voice ID
-    "B": "TX3LPaxmHKxFdv7VOQHJ"   # Replace with your preferred voice ID
+# ffmpeg encoder settings per output mode. "mp3" is the original 44.1 kHz
+# download format; "pcm" and "opus" match the LiveKit room (48 kHz mono,
+# 20 ms frames) so playback skips resampling, and for pcm decoding too.
+OUTPUT_FORMATS = {
+    "mp3": {
+        "extension": "mp3",
+        "args": ["-ac", "1", "-ar", "44100", "-b:a", "128k"],
+    },
+    "pcm": {
+        "extension": "pcm",
+        "args": [
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ac", str(dialogue_assets.NUM_CHANNELS),
+            "-ar", str(dialogue_assets.SAMPLE_RATE),
+        ],
+    },
+    "opus": {
+        "extension": "ogg",
+        "args": [
+            "-c:a", "libopus", "-b:a", "32k", "-application", "voip",
+            "-frame_duration", str(dialogue_assets.FRAME_DURATION_MS),
+            "-ac", str(dialogue_assets.NUM_CHANNELS),
+            "-ar", str(dialogue_assets.SAMPLE_RATE),
+        ],
+    },
 }
 
 def ensure_audio_directory():
@@ -28,29 +57,8 @@ def ensure_audio_directory():
 
 def generate_dialogue(target_word: str) -> List[Dict[str, str]]:
     """Generate a dialogue using OpenAI that naturally incorporates the target word."""
-    system_prompt = """
-    You are a dialogue writer. Create a short, natural dialogue (2-3 turns) between two people (A and B).
-    The dialogue should naturally incorporate the given target word without explicitly explaining it.
-    Return ONLY a JSON array of objects, each with 'speaker' and 'text' keys.
-    Keep the dialogue casual and relatable, ensuring it flows naturally when spoken.
-    Example format:
-    [
-        {"speaker": "A", "text": "Hey, did you hear about the new app?"},
-        {"speaker": "B", "text": "No, what's it about?"}
-    ]
-    """
-    
-    user_prompt = f"""
-    Target word: "{target_word}"
-    Requirements:
-    - Use speakers A and B
-    - Include the word naturally in context
-    - Keep it conversational and realistic
-    - Maximum 3 turns
-    - Don't give away the meaning of the target word in the dialogue.
-    - Make sure the dialogue flows well when spoken
-    - Return ONLY the JSON array, no other text
-    """
+    system_prompt = load_prompt('dialogue_writer')
+    user_prompt = load_prompt('dialogue_writer', key='user_prompt').format(target_word=target_word)
 
     response = openai_client.chat.completions.create(
         model="gpt-4",
@@ -65,8 +73,91 @@ def generate_dialogue(target_word: str) -> List[Dict[str, str]]:
     except json.JSONDecodeError:
         raise ValueError("Failed to parse OpenAI response as JSON. Response: " + response.choices[0].message.content)
 
-def create_audio_dialogue(dialogue: List[Dict[str, str]], target_word: str):
-    """Convert dialogue to speech using ElevenLabs API."""
+def _request_speech(text: str, voice_id: str, model_id: str) -> Tuple[bytes, Optional[Dict[str, List]]]:
+    """Synthesize one request with ElevenLabs, returning mp3 bytes and character timestamps.
+
+    Uses the with-timestamps endpoint, whose alignment has 'characters',
+    'character_start_times_seconds' and 'character_end_times_seconds' lists
+    relative to the start of this request. The alignment is None if missing.
+    """
+    response = requests.post(
+        f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}/with-timestamps",
+        headers={
+            "xi-api-key": os.getenv("ELEVEN_API_KEY"),
+            "Content-Type": "application/json",
+        },
+        json={
+            "text": text,
+            "model_id": model_id,
+            "voice_settings": {
+                "stability": 0.5,
+                "similarity_boost": 0.75
+            }
+        },
+    )
+    
+    if response.status_code != 200:
+        print(f"Error from ElevenLabs API: Status {response.status_code}")
+        print("Response:", response.text)
+        raise Exception(f"Failed to generate audio for voice {voice_id}")
+    
+    data = response.json()
+    return base64.b64decode(data["audio_base64"]), data.get("alignment")
+
+def synthesize_turn(text: str, voice_id: str, model: tts_models.TTSModel) -> Tuple[bytes, Optional[Dict[str, List]]]:
+    """Synthesize one turn, splitting text longer than the model's request limit.
+
+    Chunks are split at sentence boundaries and requested concurrently. Their
+    mp3 bytes are concatenated and their timestamps shifted onto one timeline.
+    """
+    chunks = tts_models.split_text(text, model.max_text_length)
+    if len(chunks) == 1:
+        return _request_speech(text, voice_id, model.model_id)
+
+    print(f"Splitting turn into {len(chunks)} requests for {model.model_id}")
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        results = list(executor.map(lambda chunk: _request_speech(chunk, voice_id, model.model_id), chunks))
+
+    audio = b""
+    merged = {"characters": [], "character_start_times_seconds": [], "character_end_times_seconds": []}
+    offset = 0.0
+    for chunk, (chunk_audio, alignment) in zip(chunks, results):
+        if not alignment:
+            alignment = dialogue_assets.estimate_char_alignment(chunk, MP3(io.BytesIO(chunk_audio)).info.length)
+        if merged["characters"]:
+            # Keep the space lost at the split so words stay separate
+            merged["characters"].append(" ")
+            merged["character_start_times_seconds"].append(offset)
+            merged["character_end_times_seconds"].append(offset)
+        merged["characters"].extend(alignment["characters"])
+        merged["character_start_times_seconds"].extend(offset + t for t in alignment["character_start_times_seconds"])
+        merged["character_end_times_seconds"].extend(offset + t for t in alignment["character_end_times_seconds"])
+        audio += chunk_audio
+        offset += MP3(io.BytesIO(chunk_audio)).info.length
+    return audio, merged
+
+def create_audio_dialogue(
+    dialogue: List[Dict[str, str]],
+    target_word: str,
+    output_format: str = "mp3",
+    language: str = "en",
+    model_preference: str = "fast",
+):
+    """Convert dialogue to speech using ElevenLabs API.
+
+    Args:
+        dialogue: List of turns with 'speaker' and 'text' keys
+        target_word: Target word, used to name the output file
+        output_format: One of OUTPUT_FORMATS ("mp3", "pcm" or "opus")
+        language: Language of the dialogue, used to select the TTS model
+        model_preference: "fast" or "cheap"; see tts_models.select_model
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    encoding = OUTPUT_FORMATS[output_format]
+    model = tts_models.select_model(language, prefer=model_preference)
+    print(f"Using TTS model {model.model_id}")
+
     # Create a temporary directory for intermediate files
     with tempfile.TemporaryDirectory() as temp_dir:
         print("\nCreating silence file...")
@@ -100,35 +191,18 @@ def create_audio_dialogue(dialogue: List[Dict[str, str]], target_word: str):
         print("\nGenerating individual audio files for each turn...")
         # Generate individual audio files for each turn
         audio_files = []
+        turn_alignments = []
         for i, turn in enumerate(dialogue):
             print(f"\nGenerating audio for turn {i+1}/{len(dialogue)} (Speaker {turn['speaker']})...")
             print(f"Text: {turn['text']}")
-            # Generate speech for this turn
-            response = requests.post(
-                f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_IDS[turn['speaker']]}",
-                headers={
-                    "xi-api-key": os.getenv("ELEVEN_API_KEY"),
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "text": turn["text"],
-                    "model_id": "eleven_multilingual_v2",
-                    "voice_settings": {
-                        "stability": 0.5,
-                        "similarity_boost": 0.75
-                    }
-                },
-            )
-            
-            if response.status_code != 200:
-                print(f"Error from ElevenLabs API: Status {response.status_code}")
-                print("Response:", response.text)
-                raise Exception(f"Failed to generate audio for speaker {turn['speaker']}")
+            # Generate speech for this turn, with character timestamps
+            audio_bytes, char_alignment = synthesize_turn(turn["text"], VOICE_IDS[turn['speaker']], model)
             
             # Save the audio response to a temporary file
             temp_file = os.path.join(temp_dir, f"turn_{i}.mp3")
             with open(temp_file, "wb") as f:
-                f.write(response.content)
+                f.write(audio_bytes)
+            turn_alignments.append(char_alignment)
             print(f"Audio generated successfully for turn {i+1}")
             
             # Add both the audio file and silence to our list
@@ -154,17 +228,15 @@ def create_audio_dialogue(dialogue: List[Dict[str, str]], target_word: str):
         filter_complex = f"{''.join(filter_parts)}concat=n={len(audio_files)}:v=0:a=1[outa]"
         
         # Combine all audio files using filter complex
-        output_path = f"audios/{target_word.replace(' ', '_')}.mp3"
+        output_path = f"audios/{target_word.replace(' ', '_')}.{encoding['extension']}"
         print("\nExecuting final concatenation...")
         cmd = [
             "ffmpeg",
             *inputs,
             "-filter_complex", filter_complex,
             "-map", "[outa]",
-            "-ac", "1",
-            "-ar", "44100",
-            "-b:a", "128k",
-            output_path
+            *encoding["args"],
+            "-y", output_path
         ]
         
         print("\nExecuting ffmpeg command:")
@@ -202,12 +274,32 @@ def create_audio_dialogue(dialogue: List[Dict[str, str]], target_word: str):
                     print(result.stderr)
                 subprocess.run(["mv", next_temp, temp_output], check=True)
             
-            subprocess.run(["mv", temp_output, output_path], check=True)
+            # Re-encode the combined mp3 into the requested output format
+            subprocess.run([
+                "ffmpeg", "-i", temp_output, *encoding["args"], "-y", output_path
+            ], check=True, capture_output=True)
+
+        if output_format == "pcm":
+            dialogue_assets.pad_to_frame_boundary(output_path)
         
         print(f"\nSaved combined audio file to {output_path}")
+
+        # Record turn offsets and character/word timestamps next to the audio
+        turns = []
+        offset = 0.0
+        silence_duration = dialogue_assets.audio_duration(silence_file)
+        for i, turn in enumerate(dialogue):
+            duration = dialogue_assets.audio_duration(os.path.join(temp_dir, f"turn_{i}.mp3"))
+            turns.append(dialogue_assets.build_turn_alignment(
+                turn, start=offset, duration=duration, char_alignment=turn_alignments[i]
+            ))
+            offset += duration + silence_duration
+        alignment_path = dialogue_assets.save_alignment(output_path, target_word, turns)
+        print(f"Saved alignment data to {alignment_path}")
+
         return output_path
 
-def main(target_word: str):
+def main(target_word: str, output_format: str = "mp3"):
     """Main function to generate and save dialogue."""
     ensure_audio_directory()
     
@@ -220,13 +312,13 @@ def main(target_word: str):
         print(f"{turn['speaker']}: {turn['text']}")
     
     print("\nStarting text-to-speech conversion...")
-    output_path = create_audio_dialogue(dialogue, target_word)
+    output_path = create_audio_dialogue(dialogue, target_word, output_format)
     print(f"\nProcess completed! Audio saved to: {output_path}")
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 2:
-        print("Usage: python dialogue_generator.py <target_word>")
+    if len(sys.argv) not in (2, 3) or (len(sys.argv) == 3 and sys.argv[2] not in OUTPUT_FORMATS):
+        print(f"Usage: python dialogue_generator.py <target_word> [{'|'.join(OUTPUT_FORMATS)}]")
         sys.exit(1)
     
-    main(sys.argv[1])
\ No newline at end of file
+    main(*sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+Structured event log that never blocks the voice loop.
+
+Agents and tools call ``get_event_log().emit(...)`` instead of ``print``. Each
+record (timestamp, event name, session ID, agent, tool and any extra fields)
+goes onto a bounded in-memory queue with ``put_nowait``; if the queue is full
+the record is dropped and counted rather than waiting. A background task
+drains the queue in batches and writes them as JSON lines in a worker thread,
+so a slow stdout or log pipe only delays the writer.
+
+Records go to stdout by default, or are appended to ``EVENT_LOG_PATH`` if set.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EventRecord:
+    """One structured log record."""
+    event: str
+    session_id: Optional[str] = None
+    agent: Optional[str] = None
+    tool: Optional[str] = None
+    fields: Dict[str, Any] = field(default_factory=dict)
+    ts: float = field(default_factory=time.time)
+
+
+class StreamSink:
+    """Writes batches to a text stream, stdout by default."""
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self._stream = stream
+
+    def write(self, lines: List[str]) -> None:
+        stream = self._stream or sys.stdout
+        stream.write("".join(lines))
+        stream.flush()
+
+
+class FileSink:
+    """Appends batches to a file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def write(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+
+def _current_session_id() -> Optional[str]:
+    """The room name of the job running on this task, like the usage meters' session IDs."""
+    try:
+        from livekit.agents import get_job_context
+        return get_job_context().room.name
+    except Exception:
+        return None
+
+
+class EventLog:
+    """Bounded queue of event records drained in batches by a background writer."""
+
+    def __init__(self, sink=None, max_queue: int = 10000, batch_size: int = 256) -> None:
+        """
+        Args:
+            sink: Object with a blocking ``write(lines)``; runs in a worker thread
+            max_queue: Records held before new ones are dropped
+            batch_size: Most records written per sink call
+        """
+        self.sink = sink or StreamSink()
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Optional[asyncio.Future] = None  # the writer's current batch
+
+    def emit(self, event: str, agent=None, tool: Optional[str] = None, **fields: Any) -> None:
+        """Queue a record without blocking.
+
+        Args:
+            event: Event name, e.g. "tool_executed"
+            agent: Agent instance or name
+            tool: Function tool name, if any
+            **fields: Extra JSON-serializable fields
+        """
+        if agent is not None and not isinstance(agent, str):
+            agent = type(agent).__name__
+        record = EventRecord(event, _current_session_id(), agent, tool, fields)
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self._ensure_writer()
+
+    def _ensure_writer(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        except RuntimeError:
+            pass  # no loop yet; the first emit from inside one starts the writer
+
+    def _take_batch(self, first: Optional[EventRecord] = None) -> List[str]:
+        records = [first] if first is not None else []
+        while len(records) < self.batch_size and not self._queue.empty():
+            records.append(self._queue.get_nowait())
+        if self.dropped:
+            records.append(EventRecord("event_log_dropped", fields={"count": self.dropped}))
+            self.dropped = 0
+        return [json.dumps(asdict(record), default=str) + "\n" for record in records]
+
+    async def _write(self, lines: List[str]) -> None:
+        try:
+            await asyncio.to_thread(self.sink.write, lines)
+        except Exception:
+            logger.exception("failed to write %d event records", len(lines))
+
+    async def _run(self) -> None:
+        while True:
+            # Wait for one record, then take whatever else is already queued
+            first = await self._queue.get()
+            # Shielded so flush can stop the writer without abandoning a batch it has taken
+            self._in_flight = asyncio.ensure_future(self._write(self._take_batch(first)))
+            await asyncio.shield(self._in_flight)
+            self._in_flight = None
+
+    async def flush(self) -> None:
+        """Write everything queued so far, e.g. from a job shutdown callback."""
+        # Stop the writer first, then finish the batch it was holding, so nothing
+        # taken off the queue is still unwritten when this returns
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._in_flight is not None:
+            await self._in_flight
+            self._in_flight = None
+        while not self._queue.empty() or self.dropped:
+            await self._write(self._take_batch())
+
+
+_event_log: Optional[EventLog] = None
+
+
+def get_event_log() -> EventLog:
+    """The event log shared by every session in this worker process."""
+    global _event_log
+    if _event_log is None:
+        path = os.getenv("EVENT_LOG_PATH")
+        _event_log = EventLog(FileSink(path) if path else StreamSink())
+    return _event_log
@@ -0,0 +1,102 @@
+"""
+Import-time profile report for worker cold start.
+
+Runs ``python -X importtime`` in a fresh interpreter for each target module and
+prints the slowest imports by cumulative time, so we can see where process
+startup goes before the first job is accepted.
+
+Usage:
+    python import_profile.py                     # profile agent.py
+    python import_profile.py agent providers:build_stt --top 30
+"""
+
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass
+class ImportTiming:
+    """One line of ``-X importtime`` output."""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTiming]:
+    """Parse the stderr produced by ``python -X importtime``.
+
+    Lines look like ``import time:       123 |       4567 |   package.module``,
+    where the indentation of the module name encodes nesting depth.
+    """
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        timings.append(ImportTiming(
+            module=stripped,
+            self_us=int(parts[0]),
+            cumulative_us=int(parts[1]),
+            depth=(len(name) - len(stripped) - 1) // 2,
+        ))
+    return timings
+
+
+def profile_target(target: str) -> List[ImportTiming]:
+    """Import ``target`` in a fresh interpreter and return its import timings.
+
+    ``target`` is a module name, optionally followed by ``:callable`` to also
+    call a zero-argument factory (e.g. ``providers:build_stt``) so that anything
+    it imports on first use is included in the profile.
+    """
+    module, _, attr = target.partition(":")
+    code = f"import {module}"
+    if attr:
+        code += f"; {module}.{attr}()"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        # importtime lines are still useful up to the failure point
+        print(f"Warning: importing {target} failed:\n{result.stderr.splitlines()[-1]}")
+    return parse_importtime(result.stderr)
+
+
+def print_report(target: str, timings: List[ImportTiming], top: int) -> None:
+    """Print total import time and the slowest top-level and nested imports."""
+    total_us = sum(t.cumulative_us for t in timings if t.depth == 0)
+    print(f"\n=== {target}: {total_us / 1000:.1f} ms total, {len(timings)} modules ===")
+
+    print("\nSlowest top-level imports (cumulative):")
+    top_level = sorted((t for t in timings if t.depth == 0), key=lambda t: t.cumulative_us, reverse=True)
+    for t in top_level[:top]:
+        print(f"  {t.cumulative_us / 1000:9.1f} ms  {t.module}")
+
+    print("\nSlowest modules (self time):")
+    for t in sorted(timings, key=lambda t: t.self_us, reverse=True)[:top]:
+        print(f"  {t.self_us / 1000:9.1f} ms  {t.module}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report import-time cost of worker modules.")
+    parser.add_argument("targets", nargs="*", default=["agent"],
+                        help="modules to import, optionally module:factory")
+    parser.add_argument("--top", type=int, default=20, help="number of rows per table")
+    args = parser.parse_args()
+
+    for target in args.targets:
+        print_report(target, profile_target(target), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,4 +24,5 @@ def setup_langfuse(
 
     trace_provider = TracerProvider()
     trace_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
-    set_tracer_provider(trace_provider)
\ No newline at end of file
+    set_tracer_provider(trace_provider)
+    return trace_provider
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Lexical items taught by the agents.
+
+``LEXICON`` maps each phrase to its senses in the same dictionary format that
+``create_target_lexical_item`` accepts; the scheduler hands out fresh
+``TargetLexicalItem`` copies built from it, so per-session progress flags
+never leak between sessions.
+"""
+
+from dataclasses import dataclass
+from typing import List, Dict, Any
+
+@dataclass
+class LexicalSense:
+    """Represents one meaning/sense of a lexical item"""
+    sense_number: int
+    definition: str
+    examples: List[str]
+    explained: bool = False  # Track if user has explained this sense
+
+@dataclass
+class TargetLexicalItem:
+    """Represents a multi-sense lexical item"""
+    phrase: str
+    senses: List[LexicalSense]
+    
+    @property
+    def total_senses(self) -> int:
+        return len(self.senses)
+    
+    @property
+    def explained_senses(self) -> List[LexicalSense]:
+        return [sense for sense in self.senses if sense.explained]
+    
+    @property
+    def remaining_senses(self) -> List[LexicalSense]:
+        return [sense for sense in self.senses if not sense.explained]
+    
+    @property
+    def all_explained(self) -> bool:
+        return len(self.explained_senses) == self.total_senses
+    
+    def mark_sense_explained(self, sense_number: int) -> bool:
+        """Mark a sense as explained. Returns True if found and marked."""
+        for sense in self.senses:
+            if sense.sense_number == sense_number:
+                sense.explained = True
+                return True
+        return False
+
+def create_target_lexical_item(phrase: str, senses_data: List[Dict[str, Any]]) -> TargetLexicalItem:
+    """Helper function to create a TargetLexicalItem from dictionary data.
+    
+    Args:
+        phrase: The lexical item phrase (e.g., "SETTLE DOWN")
+        senses_data: List of dictionaries with keys: senseNumber, definition, examples
+    
+    Returns:
+        TargetLexicalItem instance
+    """
+    senses = []
+    for sense_dict in senses_data:
+        sense = LexicalSense(
+            sense_number=sense_dict["senseNumber"],
+            definition=sense_dict["definition"],
+            examples=sense_dict["examples"]
+        )
+        senses.append(sense)
+    
+    return TargetLexicalItem(phrase=phrase, senses=senses)
+
+
+LEXICON: Dict[str, List[Dict[str, Any]]] = {
+    "SETTLE DOWN": [
+        {
+            "senseNumber": 1,
+            "definition": "Adopt a quieter and steadier lifestyle",
+            "examples": [
+                "I just want to fall in love with the right guy and settle down."
+            ]
+        },
+        {
+            "senseNumber": 2,
+            "definition": "Become calmer, quieter, more orderly",
+            "examples": [
+                "We need things to settle down before we can make a serious decision."
+            ]
+        }
+    ],
+}
@@ -0,0 +1,191 @@
+"""
+Live dialogue generation streamed straight into a room.
+
+Instead of playing a dialogue rendered offline by ``dialogue_generator.py``,
+``LiveDialogue`` runs the whole thing as a pipeline inside the session:
+
+1. the LLM streams the dialogue JSON, and each turn is parsed as soon as its
+   object is complete;
+2. each parsed turn immediately starts streaming ElevenLabs synthesis into its
+   own queue, so later turns synthesize while earlier ones are playing;
+3. ``frames`` yields 48 kHz frames turn by turn, with a short pause between
+   turns, starting as soon as the first turn's audio arrives.
+
+As it yields, ``frames`` keeps the audio and each turn's start and end
+offsets, so ``alignment`` and ``replay`` can serve the same dialogue again in
+the format of an offline asset's alignment sidecar.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from livekit import rtc
+from livekit.agents import ChatContext
+
+import dialogue_assets
+import providers
+import tts_models
+from provider_pool import get_pool
+from prompts.loader import load_prompt
+
+logger = logging.getLogger(__name__)
+
+# Pause between turns, as in the offline generator
+TURN_GAP_SECONDS = 0.2
+
+
+def parse_turns(buffer: str) -> Tuple[List[Dict[str, str]], str]:
+    """Pull complete ``{"speaker": ..., "text": ...}`` objects out of a partial JSON array.
+
+    Returns:
+        (turns, rest) where ``rest`` is the unparsed tail to prepend to the next chunk
+    """
+    decoder = json.JSONDecoder()
+    turns = []
+    while True:
+        start = buffer.find("{")
+        if start < 0:
+            return turns, ""
+        try:
+            turn, end = decoder.raw_decode(buffer, start)
+        except json.JSONDecodeError:
+            return turns, buffer[start:]
+        turns.append(turn)
+        buffer = buffer[end:]
+
+
+class LiveDialogue:
+    """Generates, synthesizes and plays one dialogue for a target word."""
+
+    def __init__(self, target_word: str, llm, language: str = "en", meter=None) -> None:
+        """
+        Args:
+            target_word: Word or phrase the dialogue must use
+            llm: LiveKit LLM used to write the dialogue (e.g. the agent's)
+            language: Dialogue language, used to select the ElevenLabs model
+            meter: The session's ``usage_metering.SessionMeter``, to count the voices' characters
+        """
+        self.target_word = target_word
+        self._meter = meter
+        self.turns: List[Dict[str, str]] = []
+        self.duration = 0.0  # seconds of audio yielded so far
+        self._turn_alignments: List[Dict[str, Any]] = []
+        self._recorded: List[rtc.AudioFrame] = []
+        self._llm = llm
+        self._model = tts_models.select_model(language, prefer="fast")
+        self._turn_queues: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    async def frames(self) -> AsyncIterator[rtc.AudioFrame]:
+        """Yield the dialogue's audio as it is generated; pass to BackgroundAudioPlayer."""
+        self._tasks.append(asyncio.create_task(self._write_dialogue()))
+        try:
+            index = 0
+            while (queue := await self._turn_queues.get()) is not None:
+                if index > 0:
+                    for frame in dialogue_assets.silence_frames(TURN_GAP_SECONDS):
+                        self._record(frame)
+                        yield frame
+                start = self.duration
+                while (frame := await queue.get()) is not None:
+                    if isinstance(frame, BaseException):
+                        raise frame
+                    self._record(frame)
+                    yield frame
+                # Turn queues are created in the same order turns are parsed
+                self._turn_alignments.append(
+                    dialogue_assets.build_turn_alignment(self.turns[index], start, self.duration - start, None)
+                )
+                index += 1
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    def _record(self, frame: rtc.AudioFrame) -> None:
+        self._recorded.append(frame)
+        self.duration += frame.duration
+
+    @property
+    def alignment(self) -> Dict[str, Any]:
+        """Turn offsets of the audio played so far, like ``dialogue_assets.load_alignment``."""
+        return {"target_word": self.target_word, "turns": list(self._turn_alignments)}
+
+    async def replay(self, start: float = 0.0, end: Optional[float] = None) -> AsyncIterator[rtc.AudioFrame]:
+        """Yield the recorded audio between two offsets, e.g. a segment from ``alignment``.
+
+        Args:
+            start: Offset in seconds of the first frame to yield
+            end: Offset in seconds to stop at (None plays to the end)
+        """
+        position = 0.0
+        for frame in list(self._recorded):
+            frame_end = position + frame.duration
+            if frame_end > start:
+                yield frame
+            position = frame_end
+            if end is not None and position >= end:
+                break
+
+    async def _write_dialogue(self) -> None:
+        """Stream the dialogue from the LLM and start synthesizing each turn as it completes."""
+        chat_ctx = ChatContext()
+        chat_ctx.add_message(role="system", content=load_prompt('dialogue_writer'))
+        chat_ctx.add_message(
+            role="user",
+            content=load_prompt('dialogue_writer', key='user_prompt').format(target_word=self.target_word),
+        )
+        buffer = ""
+        try:
+            async with self._llm.chat(chat_ctx=chat_ctx) as stream:
+                async for chunk in stream:
+                    if not chunk.delta or not chunk.delta.content:
+                        continue
+                    turns, buffer = parse_turns(buffer + chunk.delta.content)
+                    for turn in turns:
+                        self._start_turn(turn)
+        except Exception as e:
+            logger.exception("live dialogue generation failed")
+            error_queue: asyncio.Queue = asyncio.Queue()
+            error_queue.put_nowait(e)
+            self._turn_queues.put_nowait(error_queue)
+        finally:
+            self._turn_queues.put_nowait(None)
+
+    def _start_turn(self, turn: Dict[str, str]) -> None:
+        self.turns.append(turn)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._turn_queues.put_nowait(queue)
+        self._tasks.append(asyncio.create_task(self._synthesize_turn(turn, queue)))
+
+    async def _synthesize_turn(self, turn: Dict[str, str], queue: asyncio.Queue) -> None:
+        """Stream one turn's audio into ``queue`` at the room's sample rate, then a None sentinel."""
+        voice_id = tts_models.VOICE_IDS.get(turn.get("speaker"), tts_models.VOICE_IDS["A"])
+        tts = providers.build_dialogue_tts(voice_id, self._model.model_id)
+        if self._meter is not None:
+            # Not part of the agent pipeline, so its metrics never reach the session
+            self._meter.watch_tts(tts)
+        resampler: Optional[rtc.AudioResampler] = None
+        try:
+            async with tts.synthesize(turn["text"]) as stream:
+                async for audio in stream:
+                    frame = audio.frame
+                    if frame.sample_rate == dialogue_assets.SAMPLE_RATE:
+                        queue.put_nowait(frame)
+                        continue
+                    if resampler is None:
+                        resampler = rtc.AudioResampler(
+                            frame.sample_rate, dialogue_assets.SAMPLE_RATE, num_channels=frame.num_channels
+                        )
+                    for resampled in resampler.push(frame):
+                        queue.put_nowait(resampled)
+            if resampler is not None:
+                for resampled in resampler.flush():
+                    queue.put_nowait(resampled)
+        except Exception as e:
+            logger.exception("live dialogue synthesis failed")
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(None)
+            get_pool().release(tts)
@@ -0,0 +1,153 @@
+"""
+Pipeline profiles chosen from live worker load.
+
+Every agent used to get the same heavy pipeline: Nova-3 multi-language STT,
+Chirp3-HD TTS, gpt-4o-mini and the multilingual turn detector, which runs
+inference on the worker's own CPU for every end of utterance. When a worker is
+saturated that configuration makes every session slow at once. Instead,
+``providers.build_pipeline`` asks the ``TierSelector`` for a ``PipelineProfile``
+each time an agent is built, which is at session start and at every handoff.
+
+Tiers, heaviest first:
+- full: the original configuration
+- balanced: a cheaper Neural2 TTS voice
+- lite: Spanish-only STT, a Standard TTS voice, smaller LLMs, and VAD-only
+  end-of-turn detection, so no turn detector inference runs on the worker
+
+Tiering is CPU-only. Each job runs in its own process, so a per-process
+session count would always be 0 or 1. Load is the host's one-minute load
+average per CPU instead. It reflects every job on the worker's machine and is
+valid on the first read in a fresh job process, unlike
+``psutil.cpu_percent``, whose first call always returns 0. Being a moving
+average, it is also smooth across jobs, which each start from the heaviest
+tier. Each lighter tier has a higher threshold to enter than to leave, so the
+tier does not flap around a boundary. Set ``PIPELINE_TIER`` to pin a tier.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PipelineProfile:
+    """Plugin configuration for one agent's pipeline."""
+    name: str
+    stt_model: str           # Deepgram model
+    stt_language: str        # "multi" or a language code
+    tts_voice: str           # Google voice, without the locale prefix
+    llm_model: str           # OpenAI model
+    fallback_llm_model: str  # Gemini model
+    turn_detection: str      # "multilingual" or "vad"
+
+
+FULL = PipelineProfile(
+    name="full",
+    stt_model="nova-3",
+    stt_language="multi",
+    tts_voice="Chirp3-HD-Puck",
+    llm_model="gpt-4o-mini",
+    fallback_llm_model="gemini-2.0-flash",
+    turn_detection="multilingual",
+)
+
+BALANCED = PipelineProfile(
+    name="balanced",
+    stt_model="nova-3",
+    stt_language="multi",
+    tts_voice="Neural2-B",
+    llm_model="gpt-4o-mini",
+    fallback_llm_model="gemini-2.0-flash",
+    turn_detection="multilingual",
+)
+
+# Learners answer in their native language (Spanish), so a single-language STT still fits
+LITE = PipelineProfile(
+    name="lite",
+    stt_model="nova-3",
+    stt_language="es",
+    tts_voice="Standard-B",
+    llm_model="gpt-4.1-nano",
+    fallback_llm_model="gemini-2.0-flash-lite",
+    turn_detection="vad",
+)
+
+TIERS: Tuple[PipelineProfile, ...] = (FULL, BALANCED, LITE)
+
+# (enter, leave) load thresholds for each tier after the first
+THRESHOLDS: Tuple[Tuple[float, float], ...] = ((0.70, 0.55), (0.85, 0.70))
+
+
+class TierSelector:
+    """Picks a tier from the host's load average, with hysteresis."""
+
+    def __init__(
+        self,
+        tiers: Tuple[PipelineProfile, ...] = TIERS,
+        thresholds: Tuple[Tuple[float, float], ...] = THRESHOLDS,
+        sample_interval: float = 1.0,
+    ) -> None:
+        """
+        Args:
+            tiers: Profiles, heaviest first
+            thresholds: (enter, leave) load for each tier after the first
+            sample_interval: Minimum seconds between load samples
+        """
+        self.tiers = tiers
+        self.thresholds = thresholds
+        self.sample_interval = sample_interval
+        self.load = 0.0
+        self._index = 0
+        self._sampled_at: Optional[float] = None
+
+    def sample_load(self) -> float:
+        """Host load in [0, 1]: the one-minute load average over the CPU count."""
+        return min(psutil.getloadavg()[0] / (psutil.cpu_count() or 1), 1.0)
+
+    def update(self, load: float) -> PipelineProfile:
+        """Move between tiers for ``load`` and return the current one."""
+        index = self._index
+        while index < len(self.thresholds) and load >= self.thresholds[index][0]:
+            index += 1
+        while index > 0 and load < self.thresholds[index - 1][1]:
+            index -= 1
+        if index != self._index:
+            logger.info(
+                "pipeline tier %s -> %s (load %.2f)",
+                self.tiers[self._index].name, self.tiers[index].name, load,
+            )
+            self._index = index
+        return self.tiers[index]
+
+    def current(self) -> PipelineProfile:
+        """Profile for an agent being built now."""
+        pinned = os.getenv("PIPELINE_TIER")
+        if pinned:
+            for tier in self.tiers:
+                if tier.name == pinned:
+                    return tier
+            logger.warning("unknown PIPELINE_TIER %r, choosing from load", pinned)
+
+        now = time.monotonic()
+        if self._sampled_at is None or now - self._sampled_at >= self.sample_interval:
+            self._sampled_at = now
+            self.load = self.sample_load()
+            self.update(self.load)
+        return self.tiers[self._index]
+
+
+_selector: Optional[TierSelector] = None
+
+
+def get_selector() -> TierSelector:
+    """The tier selector for this process."""
+    global _selector
+    if _selector is None:
+        _selector = TierSelector()
+    return _selector
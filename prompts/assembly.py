@@ -0,0 +1,73 @@
+"""
+Prompt assembly laid out for provider-side prompt caching.
+
+OpenAI and Gemini cache the longest byte-identical prefix of a request, so
+everything that is the same for every session goes first and never changes:
+the agent's YAML system prompt (as its instructions) followed by the tool
+schemas LiveKit derives from the agent's ``function_tool`` methods. Anything
+per-learner or per-item (the target phrase, its senses, a generated dialogue's
+transcript) is added afterwards as a context message in the chat history
+instead of being formatted into the instructions, and ``generate_reply``
+instructions are kept static.
+
+Each stable prefix is hashed so telemetry can show which prompt version a
+worker served; ``usage_metering`` exports the hashes alongside the
+cached-token ratio per agent. Note that OpenAI only caches prefixes of at
+least 1024 tokens.
+"""
+
+import hashlib
+from functools import lru_cache
+from typing import Dict
+
+from prompts.loader import load_prompt
+
+_fingerprints: Dict[str, str] = {}
+
+
+@lru_cache(maxsize=None)
+def stable_instructions(prompt_name: str) -> str:
+    """Agent instructions for ``prompt_name``, loaded once so every session sends the same bytes.
+
+    Args:
+        prompt_name: Name of the prompt file without .yaml extension
+
+    Returns:
+        The system prompt, with no per-session content
+    """
+    instructions = load_prompt(prompt_name)
+    _fingerprints[prompt_name] = hashlib.sha256(instructions.encode("utf-8")).hexdigest()[:12]
+    return instructions
+
+
+def prefix_fingerprints() -> Dict[str, str]:
+    """Short hash of every stable prefix loaded in this process, by prompt name."""
+    return dict(_fingerprints)
+
+
+def render_target_item(target_item) -> str:
+    """Per-item context for NativeExplainAgent: the phrase and every sense to be explained."""
+    lines = [
+        f"The TARGET LEXICAL ITEM IS '{target_item.phrase}'. "
+        f"This phrasal verb has {target_item.total_senses} different meanings.",
+        "",
+        "Ask the user to explain what this phrasal verb means. When they explain a meaning, determine "
+        f"which of the {target_item.total_senses} senses they are explaining and whether it's correct.",
+        "",
+        f"The {target_item.total_senses} senses are:",
+    ]
+    for sense in target_item.senses:
+        lines.append(f"{sense.sense_number}. {sense.definition} (Example: {sense.examples[0]})")
+    return "\n".join(lines)
+
+
+async def add_session_context(agent, content: str) -> None:
+    """Append per-session content to ``agent``'s chat history, after the stable prefix.
+
+    Args:
+        agent: The active Agent
+        content: Text the LLM should see on this and every later turn
+    """
+    chat_ctx = agent.chat_ctx.copy()
+    chat_ctx.add_message(role="system", content=content)
+    await agent.update_chat_ctx(chat_ctx)
@@ -2,11 +2,12 @@ import os
 import yaml
 from pathlib import Path
 
-def load_prompt(prompt_name: str) -> str:
+def load_prompt(prompt_name: str, key: str = 'system_prompt') -> str:
     """Load a prompt from a YAML file.
     
     Args:
         prompt_name: Name of the prompt file without .yaml extension
+        key: Top-level key of the prompt within the file
         
     Returns:
         The prompt string
@@ -20,4 +21,4 @@ def load_prompt(prompt_name: str) -> str:
     with open(yaml_path, 'r') as f:
         prompt_data = yaml.safe_load(f)
         
-    return prompt_data['system_prompt'] 
\ No newline at end of file
+    return prompt_data[key] 
\ No newline at end of file
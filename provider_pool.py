@@ -0,0 +1,181 @@
+"""
+Per-process pool of speech and language provider clients.
+
+Every handoff used to build fresh ``deepgram.STT``, ``google.TTS`` and
+``openai.LLM`` instances, each with its own HTTP/WebSocket connections and TLS
+sessions to the same endpoints. The pool keeps one instance per provider
+configuration; agents borrow it while they are active and return it on exit.
+Entries nobody has borrowed for ``idle_timeout`` seconds, or that fail their
+health check, are closed and rebuilt on next use.
+
+Plugin clients are bound to the event loop they were created on, so the pool
+lives in the process. LiveKit runs each job in its own process, so reuse
+happens across the handoffs of one session, not across sessions. Work that
+should be done before a job arrives, like loading Silero, belongs in
+``providers.prewarm`` (the worker's ``prewarm_fnc``).
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    """Reuse and construction-time counters for one provider kind.
+
+    Build time covers the factory and starting its prewarm, not the network
+    handshake, which the plugins complete in the background.
+    """
+    acquisitions: int = 0
+    reuses: int = 0
+    builds: int = 0
+    build_time_total: float = 0.0
+    evictions: int = 0
+    unhealthy: int = 0
+
+    @property
+    def reuse_rate(self) -> float:
+        return self.reuses / self.acquisitions if self.acquisitions else 0.0
+
+    @property
+    def avg_build_time(self) -> float:
+        return self.build_time_total / self.builds if self.builds else 0.0
+
+
+@dataclass
+class _PoolEntry:
+    instance: Any
+    health_check: Optional[Callable[[Any], bool]]
+    created_at: float
+    last_used: float
+    leases: int = 0
+
+
+@dataclass
+class ProviderPool:
+    """Shares provider plugin instances between agents and sessions.
+
+    Keys are tuples whose first element is the provider kind ("stt", "tts",
+    "llm", ...), e.g. ``("stt", "deepgram", "nova-3", "multi")``.
+    """
+    idle_timeout: float = 300.0
+    max_age: float = 3600.0
+    _entries: Dict[Hashable, _PoolEntry] = field(default_factory=dict)
+    _keys_by_instance: Dict[int, Hashable] = field(default_factory=dict)
+    _stats: Dict[str, PoolStats] = field(default_factory=dict)
+    _eviction_task: Optional[asyncio.Task] = None
+
+    def acquire(
+        self,
+        key: tuple,
+        factory: Callable[[], Any],
+        health_check: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Borrow the instance for ``key``, creating it with ``factory`` if needed.
+
+        Args:
+            key: Provider kind followed by its configuration
+            factory: Zero-argument callable building a new plugin instance
+            health_check: Optional predicate; unhealthy instances are replaced
+
+        Returns:
+            A shared plugin instance; pass it to ``release`` when done
+        """
+        stats = self._stats.setdefault(key[0], PoolStats())
+        stats.acquisitions += 1
+        now = time.monotonic()
+        self._evict_expired(now)
+        self._ensure_eviction_task()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.health_check is not None and not entry.health_check(entry.instance):
+            stats.unhealthy += 1
+            self._remove(key)
+            entry = None
+
+        if entry is None:
+            started = time.perf_counter()
+            instance = factory()
+            # Open connections now rather than on the first user turn
+            prewarm = getattr(instance, "prewarm", None)
+            if callable(prewarm):
+                prewarm()
+            stats.builds += 1
+            stats.build_time_total += time.perf_counter() - started
+            entry = _PoolEntry(instance=instance, health_check=health_check, created_at=now, last_used=now)
+            self._entries[key] = entry
+            self._keys_by_instance[id(instance)] = key
+        else:
+            stats.reuses += 1
+
+        entry.leases += 1
+        entry.last_used = now
+        return entry.instance
+
+    def release(self, instance: Any) -> None:
+        """Return a borrowed instance. Instances not owned by the pool are ignored."""
+        key = self._keys_by_instance.get(id(instance))
+        entry = self._entries.get(key) if key is not None else None
+        if entry is None:
+            return
+        entry.leases = max(0, entry.leases - 1)
+        entry.last_used = time.monotonic()
+
+    def stats(self) -> Dict[str, PoolStats]:
+        """Counters per provider kind."""
+        return dict(self._stats)
+
+    def _evict_expired(self, now: float) -> None:
+        for key, entry in list(self._entries.items()):
+            if entry.leases:
+                continue
+            if now - entry.last_used > self.idle_timeout or now - entry.created_at > self.max_age:
+                self._stats.setdefault(key[0], PoolStats()).evictions += 1
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._keys_by_instance.pop(id(entry.instance), None)
+        aclose = getattr(entry.instance, "aclose", None)
+        if not callable(aclose):
+            return
+        try:
+            asyncio.get_running_loop().create_task(aclose())
+        except RuntimeError:
+            pass  # no running loop; the instance is dropped with the process
+
+    def _ensure_eviction_task(self) -> None:
+        if self._eviction_task is not None and not self._eviction_task.done():
+            return
+        try:
+            self._eviction_task = asyncio.get_running_loop().create_task(self.run_eviction())
+        except RuntimeError:
+            pass  # built outside the event loop; expired entries are swept on acquire
+
+    async def run_eviction(self, interval: float = 60.0) -> None:
+        """Periodically close idle entries and log pool metrics."""
+        while True:
+            await asyncio.sleep(interval)
+            self._evict_expired(time.monotonic())
+            for kind, stats in self._stats.items():
+                logger.info(
+                    "provider pool %s: %d entries, reuse rate %.0f%%, avg build %.1f ms, %d evictions",
+                    kind,
+                    sum(1 for key in self._entries if key[0] == kind),
+                    stats.reuse_rate * 100,
+                    stats.avg_build_time * 1000,
+                    stats.evictions,
+                )
+
+
+_pool = ProviderPool()
+
+
+def get_pool() -> ProviderPool:
+    """The pool shared by every agent in this job process."""
+    return _pool
@@ -0,0 +1,164 @@
+"""
+Latency- and error-aware ordering of STT, TTS and LLM providers.
+
+The router keeps a rolling window of latency samples and request outcomes per
+provider. Successes come from the session's ``metrics_collected`` events and
+failures from each FallbackAdapter child's own ``error`` events, since
+session errors name the adapter rather than the provider that failed.
+``rank`` orders a language's candidate providers fastest-healthy-first; the
+order is used to build a LiveKit ``FallbackAdapter``, which moves to the next
+provider mid-session, retrying the current request, if one fails.
+
+Providers without enough samples keep their configured order, scored just
+above the kind's latency budget, so a primary that degrades past its budget
+drops below the untried alternatives and they get measured in turn.
+"""
+
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Plugin names as they appear in metric labels and plugin module paths
+KNOWN_PROVIDERS = ("deepgram", "openai", "google", "cartesia", "elevenlabs")
+
+# Expected p95 latency per kind (seconds): STT transcription delay, TTS time
+# to first byte, LLM time to first token
+LATENCY_BUDGETS = {"stt": 0.8, "tts": 0.6, "llm": 1.0}
+
+
+def provider_from_label(label: str) -> Optional[str]:
+    """Map a metric label or module path (e.g. 'livekit.plugins.deepgram.stt.STT') to a provider name."""
+    label = label.lower()
+    for name in KNOWN_PROVIDERS:
+        if name in label:
+            return name
+    return None
+
+
+@dataclass
+class ProviderHealth:
+    """Rolling latency samples and outcomes for one provider."""
+    window: int = 50
+    latencies: Deque[float] = field(default_factory=deque)
+    outcomes: Deque[bool] = field(default_factory=deque)
+
+    def record_latency(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        if len(self.latencies) > self.window:
+            self.latencies.popleft()
+        self.record_outcome(True)
+
+    def record_outcome(self, ok: bool) -> None:
+        self.outcomes.append(ok)
+        if len(self.outcomes) > self.window:
+            self.outcomes.popleft()
+
+    @property
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+@dataclass
+class ProviderRouter:
+    """Ranks providers by rolling p95 latency, excluding those with high error rates."""
+    min_samples: int = 5
+    max_error_rate: float = 0.2
+    _health: Dict[Tuple[str, str], ProviderHealth] = field(default_factory=dict)
+    # Provider currently first in line per kind, used to attribute STT end-of-utterance delay
+    _active: Dict[str, str] = field(default_factory=dict)
+
+    def health(self, kind: str, provider: str) -> ProviderHealth:
+        return self._health.setdefault((kind, provider), ProviderHealth())
+
+    def rank(self, kind: str, candidates: List[str]) -> List[str]:
+        """Order candidate provider names fastest healthy first.
+
+        Args:
+            kind: "stt", "tts" or "llm"
+            candidates: Provider names in configured preference order
+
+        Returns:
+            The same names, reordered
+        """
+        budget = LATENCY_BUDGETS[kind]
+
+        def score(item):
+            index, name = item
+            health = self.health(kind, name)
+            unhealthy = health.error_rate > self.max_error_rate
+            if len(health.latencies) >= self.min_samples:
+                latency = health.p95
+            else:
+                latency = budget * (1 + index / 10)
+            return (unhealthy, latency)
+
+        ranked = [name for _, name in sorted(enumerate(candidates), key=score)]
+        if ranked:
+            if ranked[0] != self._active.get(kind):
+                logger.info("routing %s to %s (candidates: %s)", kind, ranked[0], ranked)
+            self._active[kind] = ranked[0]
+        return ranked
+
+    def attach(self, session) -> None:
+        """Feed the router from an AgentSession's metrics events."""
+        session.on("metrics_collected", self._on_metrics)
+
+    def watch(self, adapter, kind: str) -> None:
+        """Record failures of every child of a ``kind`` FallbackAdapter, and its availability changes."""
+        adapter.on(f"{kind}_availability_changed", lambda ev: self.on_availability_changed(kind, ev))
+        for child in getattr(adapter, f"_{kind}_instances", ()):
+            # Non-streaming STT is wrapped in a StreamAdapter; the inner plugin reports its own errors
+            for plugin in (child, getattr(child, f"wrapped_{kind}", None)):
+                if plugin is not None:
+                    plugin.on("error", lambda ev: self._on_child_error(kind, ev))
+
+    def _on_metrics(self, ev) -> None:
+        m = ev.metrics
+        if m.type == "eou_metrics":
+            provider = self._active.get("stt")
+            if provider:
+                self.health("stt", provider).record_latency(m.transcription_delay)
+            return
+
+        kind, latency = {
+            "stt_metrics": ("stt", getattr(m, "duration", 0.0)),
+            "tts_metrics": ("tts", getattr(m, "ttfb", 0.0)),
+            "llm_metrics": ("llm", getattr(m, "ttft", 0.0)),
+        }.get(m.type, (None, 0.0))
+        provider = provider_from_label(getattr(m, "label", ""))
+        # Streaming STT reports no duration; its latency comes from eou_metrics
+        if kind and provider and latency > 0:
+            self.health(kind, provider).record_latency(latency)
+
+    def _on_child_error(self, kind: str, ev) -> None:
+        # Every failed attempt counts, including ones the adapter retries
+        provider = provider_from_label(ev.label)
+        if provider:
+            self.health(kind, provider).record_outcome(False)
+
+    def on_availability_changed(self, kind: str, ev) -> None:
+        """Handler for a FallbackAdapter's ``*_availability_changed`` events."""
+        plugin = getattr(ev, kind)
+        provider = provider_from_label(type(plugin).__module__)
+        if provider and not ev.available:
+            self.health(kind, provider).record_outcome(False)
+
+
+_router = ProviderRouter()
+
+
+def get_router() -> ProviderRouter:
+    """The router shared by every session in this worker process."""
+    return _router
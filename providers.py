@@ -0,0 +1,248 @@
+"""
+Speech and language plugin factories shared by all agents.
+
+Plugins are imported here at module level, not inside the factories: importing
+a plugin registers it with LiveKit, and that has to happen on the main thread
+before the Worker is built. ``download-files`` only fetches weights for
+registered plugins, and the worker only starts its inference process (which
+runs the multilingual turn detector) if a runner is registered by then. Only
+client construction is deferred until an agent is built.
+
+Instances are borrowed from the per-process ``provider_pool`` so handoffs
+within a session reuse open connections; agents hand them back with
+``release``. ``prewarm`` loads Silero in each job process before a job is
+assigned to it.
+
+STT, TTS and LLM are FallbackAdapters over the primary provider (Deepgram,
+OpenAI, Google TTS) plus every alternative whose credentials are set, ordered
+by ``provider_router`` so the fastest healthy provider goes first and a
+failing one is skipped mid-session. Alternative plugins raise in their
+constructors without an API key, so unconfigured ones are left out, down to
+the primary alone.
+
+Models and voices come from a ``pipeline_profiles`` tier picked from host load
+whenever an agent builds its pipeline with ``build_pipeline``.
+"""
+
+import os
+import weakref
+from typing import Optional
+
+from livekit.agents import RoomInputOptions, get_job_context, llm, stt, tts
+from livekit.plugins import cartesia, deepgram, elevenlabs, google, noise_cancellation, openai, silero
+from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+from pipeline_profiles import PipelineProfile, get_selector
+from provider_pool import get_pool
+from provider_router import get_router
+
+
+# Voice each TTS instance was built with, for usage metering
+_tts_voices: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def tts_voice(tts) -> Optional[str]:
+    """Voice ``tts`` was built with by ``build_tts`` or ``build_dialogue_tts``, if any."""
+    try:
+        return _tts_voices.get(tts)
+    except TypeError:  # not weak-referenceable, so not one of ours
+        return None
+
+
+def _with_voice(tts, voice: str):
+    _tts_voices[tts] = voice
+    return tts
+
+
+def release(agent) -> None:
+    """Return an agent's pooled plugin instances, typically from ``on_exit``."""
+    pool = get_pool()
+    for instance in (agent.stt, agent.llm, agent.tts, agent.vad, agent.turn_detection):
+        if instance is not None:
+            pool.release(instance)
+
+
+def build_pipeline():
+    """STT, LLM, TTS, VAD and turn detection for a new agent, from the current load tier.
+
+    Pass as keyword arguments to ``Agent.__init__``; agents are built at session
+    start and at every handoff, so sessions move between tiers as load changes.
+    """
+    profile = get_selector().current()
+    return {
+        "stt": build_stt(profile=profile),
+        "llm": build_llm(profile=profile),
+        "tts": build_tts(profile=profile),
+        "vad": build_vad(),
+        "turn_detection": build_turn_detection(profile=profile),
+    }
+
+
+def _configured(*env_vars: str) -> bool:
+    """True if any of ``env_vars`` is set, i.e. a provider has credentials."""
+    return any(os.getenv(name) for name in env_vars)
+
+
+def _stt_candidates(language: str, model: str):
+    """STT factories for ``language`` in configured preference order."""
+    if language == "multi":
+        whisper = lambda: openai.STT(model="gpt-4o-mini-transcribe", detect_language=True)
+    else:
+        whisper = lambda: openai.STT(model="gpt-4o-mini-transcribe", language=language.split("-")[0])
+    candidates = {"deepgram": lambda: deepgram.STT(model=model, language=language)}
+    if _configured("OPENAI_API_KEY"):
+        candidates["openai"] = whisper
+    return candidates
+
+
+def _tts_candidates(language: str, voice: str):
+    """TTS factories for ``language`` (a BCP-47 locale such as 'es-US') in preference order."""
+    base_language = language.split("-")[0]
+    candidates = {
+        # See https://docs.livekit.io/agents/integrations/tts/google/
+        "google": lambda: google.TTS(language=language, voice_name=f"{language}-{voice}"),
+    }
+    if _configured("ELEVEN_API_KEY"):
+        candidates["elevenlabs"] = lambda: elevenlabs.TTS(model="eleven_flash_v2_5", language=base_language)
+    if _configured("CARTESIA_API_KEY"):
+        candidates["cartesia"] = lambda: cartesia.TTS(model="sonic-2", language=base_language)
+    return candidates
+
+
+def _llm_candidates(profile: PipelineProfile):
+    """LLM factories in preference order."""
+    candidates = {"openai": lambda: openai.LLM(model=profile.llm_model)}
+    # Gemini takes an API key, or Vertex AI application default credentials
+    vertexai = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "0").lower() in ("true", "1")
+    if vertexai or _configured("GOOGLE_API_KEY"):
+        candidates["google"] = lambda: google.LLM(model=profile.fallback_llm_model)
+    return candidates
+
+
+def _adapter_healthy(adapter) -> bool:
+    """Pool health check for a FallbackAdapter: fails once every child provider is unavailable."""
+    status = getattr(adapter, "_status", None)
+    return not status or any(child.available for child in status)
+
+
+def _llm_healthy(adapter) -> bool:
+    # openai.LLM wraps an AsyncClient; once closed it cannot send requests
+    for child in getattr(adapter, "_llm_instances", ()):
+        client = getattr(child, "_client", None)
+        if client is not None and client.is_closed():
+            return False
+    return _adapter_healthy(adapter)
+
+
+def _watch(adapter, kind: str):
+    get_router().watch(adapter, kind)
+    return adapter
+
+
+def build_stt(language: Optional[str] = None, profile: Optional[PipelineProfile] = None):
+    """Speech-to-text, Deepgram first, failing over to OpenAI if configured, in latency order.
+
+    Args:
+        language: Overrides the profile's STT language
+        profile: Pipeline tier; the current one if not given
+    """
+    profile = profile or get_selector().current()
+    language = language or profile.stt_language
+    candidates = _stt_candidates(language, profile.stt_model)
+    order = tuple(get_router().rank("stt", list(candidates)))
+    return get_pool().acquire(
+        ("stt", "fallback", language, profile.stt_model, order),
+        # Non-streaming candidates are segmented with the shared VAD
+        lambda: _watch(
+            stt.FallbackAdapter([candidates[name]() for name in order], vad=build_vad()), "stt"
+        ),
+        health_check=_adapter_healthy,
+    )
+
+
+def build_llm(profile: Optional[PipelineProfile] = None):
+    """Language model for conversation management, OpenAI first, failing over to Gemini if configured."""
+    profile = profile or get_selector().current()
+    candidates = _llm_candidates(profile)
+    order = tuple(get_router().rank("llm", list(candidates)))
+    return get_pool().acquire(
+        ("llm", "fallback", profile.llm_model, profile.fallback_llm_model, order),
+        lambda: _watch(llm.FallbackAdapter([candidates[name]() for name in order]), "llm"),
+        health_check=_llm_healthy,
+    )
+
+
+def build_tts(language: str = "es-US", profile: Optional[PipelineProfile] = None):
+    """Text-to-speech, Google first, failing over to ElevenLabs or Cartesia if configured."""
+    profile = profile or get_selector().current()
+    candidates = _tts_candidates(language, profile.tts_voice)
+    order = tuple(get_router().rank("tts", list(candidates)))
+    return get_pool().acquire(
+        ("tts", "fallback", language, profile.tts_voice, order),
+        lambda: _with_voice(
+            _watch(tts.FallbackAdapter([candidates[name]() for name in order]), "tts"),
+            f"{language}-{profile.tts_voice}",
+        ),
+        health_check=_adapter_healthy,
+    )
+
+
+def build_dialogue_tts(voice_id: str, model_id: str):
+    """ElevenLabs voice for one speaker of a generated listening dialogue."""
+    return get_pool().acquire(
+        ("tts", "elevenlabs", voice_id, model_id),
+        lambda: _with_voice(elevenlabs.TTS(voice_id=voice_id, model=model_id), voice_id),
+    )
+
+
+def prewarm(proc) -> None:
+    """``WorkerOptions.prewarm_fnc``: load Silero while the process waits for a job."""
+    proc.userdata["vad"] = silero.VAD.load()
+
+
+def _load_vad():
+    try:
+        vad = get_job_context().proc.userdata.get("vad")
+    except RuntimeError:  # not running inside a job
+        vad = None
+    return vad or silero.VAD.load()
+
+
+def build_vad():
+    """Silero voice activity detection, prewarmed by ``prewarm`` when possible."""
+    # Loading the ONNX model is the expensive part; share one per process
+    return get_pool().acquire(("vad", "silero"), _load_vad)
+
+
+def build_turn_detection(profile: Optional[PipelineProfile] = None):
+    """Multilingual end-of-turn model, or plain VAD end-of-turn on the lite tier."""
+    profile = profile or get_selector().current()
+    if profile.turn_detection == "vad":
+        return "vad"
+    return get_pool().acquire(("turn_detection", "multilingual"), MultilingualModel)
+
+
+def build_noise_cancellation():
+    """Background voice cancellation applied to the room input."""
+    return noise_cancellation.BVC()
+
+
+def build_room_input_options():
+    """Room input with BVC always on, or with room audio left to adaptive noise cancellation.
+
+    In adaptive mode the caller must call ``adaptive_noise.attach_adaptive_noise_cancellation``
+    after connecting, which provides the session's audio input instead.
+    """
+    from adaptive_noise import adaptive_noise_cancellation_enabled
+
+    if adaptive_noise_cancellation_enabled():
+        return RoomInputOptions(audio_enabled=False)
+    return RoomInputOptions(noise_cancellation=build_noise_cancellation())
+
+
+def attach_noise_cancellation(session, room) -> None:
+    """Start adaptive noise cancellation for ``session`` if it is enabled."""
+    from adaptive_noise import adaptive_noise_cancellation_enabled, attach_adaptive_noise_cancellation
+
+    if adaptive_noise_cancellation_enabled():
+        attach_adaptive_noise_cancellation(session, room, build_noise_cancellation())
@@ -0,0 +1,203 @@
+"""
+Spaced-repetition scheduler for choosing a learner's next target lexical item.
+
+Each learner has a min-heap of ``(due, ...)`` entries, one live entry per sense
+they have been taught. ``next_item`` returns the item owning the earliest due
+sense if it is due; otherwise it introduces the next unseen item from the
+lexicon, and once everything has been seen it reviews the earliest sense
+anyway. Updates from ``correct_sense_explained`` and ``wrong_answer`` push a
+new entry and bump the sense's version, so outdated entries are skipped
+lazily when they reach the top. Selection and updates are O(log n) in the
+number of senses the learner has seen; unseen items cost nothing per learner,
+so state stays small across many thousands of learners.
+
+Intervals follow a simplified SM-2: a correct answer multiplies the interval
+by the sense's ease factor, a wrong one resets it to ten minutes and lowers
+the ease.
+
+Each job runs in its own process, so the heaps are only a cache: entrypoints
+``load_learner`` from the ``session_store`` learner backend before choosing an
+item, and tools ``save_learner`` after every ``record``.
+"""
+
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lexicon import LEXICON, TargetLexicalItem, create_target_lexical_item
+from session_store import get_learner_store
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60.0
+DAY = 24 * 60 * MINUTE
+
+FIRST_INTERVAL = DAY
+RELEARN_INTERVAL = 10 * MINUTE
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+
+@dataclass
+class SenseReview:
+    """Scheduling state of one sense for one learner."""
+    due: float
+    interval: float = 0.0
+    ease: float = DEFAULT_EASE
+    version: int = 0
+
+
+@dataclass
+class LearnerState:
+    """A learner's review heap and how far into the lexicon they have got."""
+    heap: List[Tuple[float, int, str, int, int]] = field(default_factory=list)  # (due, seq, phrase, sense, version)
+    reviews: Dict[Tuple[str, int], SenseReview] = field(default_factory=dict)
+    next_new: int = 0
+
+
+class SpacedRepetitionScheduler:
+    """Chooses and updates per-learner, per-sense review times over a lexicon."""
+
+    def __init__(
+        self,
+        lexicon: Dict[str, List[Dict]] = LEXICON,
+        max_learners: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            lexicon: Phrase -> senses data, in the order new items are introduced
+            max_learners: If set, least recently used learners beyond this are dropped from memory
+            clock: Time source, in seconds
+        """
+        self._lexicon = lexicon
+        self._phrases = list(lexicon)
+        self._max_learners = max_learners
+        self._clock = clock
+        self._learners: "OrderedDict[str, LearnerState]" = OrderedDict()
+        self._seq = itertools.count()
+
+    def _state(self, learner_id: str) -> LearnerState:
+        state = self._learners.get(learner_id)
+        if state is None:
+            return self._install(learner_id, LearnerState())
+        self._learners.move_to_end(learner_id)
+        return state
+
+    def _install(self, learner_id: str, state: LearnerState) -> LearnerState:
+        self._learners[learner_id] = state
+        self._learners.move_to_end(learner_id)
+        if self._max_learners is not None and len(self._learners) > self._max_learners:
+            self._learners.popitem(last=False)
+        return state
+
+    def _push(self, state: LearnerState, phrase: str, sense_number: int, review: SenseReview) -> None:
+        review.version += 1
+        heapq.heappush(state.heap, (review.due, next(self._seq), phrase, sense_number, review.version))
+        # Outdated entries are normally skipped at the top; rebuild if they pile up below it
+        if len(state.heap) > 2 * len(state.reviews) + 16:
+            state.heap = [entry for entry in state.heap if state.reviews[(entry[2], entry[3])].version == entry[4]]
+            heapq.heapify(state.heap)
+
+    def _peek(self, state: LearnerState) -> Optional[Tuple[float, str]]:
+        """Earliest live (due, phrase), discarding outdated entries."""
+        while state.heap:
+            due, _, phrase, sense_number, version = state.heap[0]
+            if state.reviews[(phrase, sense_number)].version == version:
+                return due, phrase
+            heapq.heappop(state.heap)
+        return None
+
+    def next_phrase(self, learner_id: str, now: Optional[float] = None) -> Optional[str]:
+        """Phrase the learner should practice next, or None if the lexicon is empty."""
+        now = self._clock() if now is None else now
+        state = self._state(learner_id)
+        top = self._peek(state)
+        if top is not None and top[0] <= now:
+            return top[1]
+
+        while state.next_new < len(self._phrases):
+            phrase = self._phrases[state.next_new]
+            state.next_new += 1
+            senses = self._lexicon[phrase]
+            if any((phrase, sense["senseNumber"]) in state.reviews for sense in senses):
+                continue  # already reviewed outside the normal order
+            for sense in senses:
+                review = SenseReview(due=now)
+                state.reviews[(phrase, sense["senseNumber"])] = review
+                self._push(state, phrase, sense["senseNumber"], review)
+            return phrase
+
+        return top[1] if top is not None else None
+
+    def next_item(self, learner_id: str, now: Optional[float] = None) -> Optional[TargetLexicalItem]:
+        """A fresh TargetLexicalItem for the learner's next phrase."""
+        phrase = self.next_phrase(learner_id, now)
+        if phrase is None:
+            return None
+        return create_target_lexical_item(phrase, self._lexicon[phrase])
+
+    def export_learner(self, learner_id: str) -> Dict[str, Any]:
+        """A learner's state as plain JSON-serializable data, for a ``LearnerStore``."""
+        state = self._state(learner_id)
+        return {
+            "next_new": state.next_new,
+            "reviews": [
+                [phrase, sense_number, review.due, review.interval, review.ease]
+                for (phrase, sense_number), review in state.reviews.items()
+            ],
+        }
+
+    def import_learner(self, learner_id: str, data: Dict[str, Any]) -> None:
+        """Replace a learner's cached state with ``export_learner`` output."""
+        state = LearnerState(next_new=data.get("next_new", 0))
+        for phrase, sense_number, due, interval, ease in data.get("reviews", []):
+            if phrase not in self._lexicon:
+                continue  # item has since been removed from the lexicon
+            review = SenseReview(due=due, interval=interval, ease=ease)
+            state.reviews[(phrase, sense_number)] = review
+            self._push(state, phrase, sense_number, review)
+        self._install(learner_id, state)
+
+    def record(
+        self, learner_id: str, phrase: str, sense_number: int, correct: bool, now: Optional[float] = None
+    ) -> None:
+        """Reschedule one sense after the learner explained it correctly or not."""
+        now = self._clock() if now is None else now
+        state = self._state(learner_id)
+        review = state.reviews.setdefault((phrase, sense_number), SenseReview(due=now))
+        if correct:
+            review.interval = FIRST_INTERVAL if review.interval < FIRST_INTERVAL else review.interval * review.ease
+            review.ease += 0.1
+        else:
+            review.interval = RELEARN_INTERVAL
+            review.ease = max(MIN_EASE, review.ease - 0.2)
+        review.due = now + review.interval
+        self._push(state, phrase, sense_number, review)
+
+
+_scheduler = SpacedRepetitionScheduler()
+
+
+def get_scheduler() -> SpacedRepetitionScheduler:
+    """The scheduler for this process, a cache over the learner store."""
+    return _scheduler
+
+
+async def load_learner(learner_id: str) -> None:
+    """Load a learner's saved state into the scheduler; call at session start."""
+    data = await get_learner_store().load(learner_id)
+    if data is not None:
+        _scheduler.import_learner(learner_id, data)
+
+
+async def save_learner(learner_id: str) -> None:
+    """Persist a learner's state; call after ``record``."""
+    try:
+        await get_learner_store().save(learner_id, _scheduler.export_learner(learner_id))
+    except Exception:
+        logger.exception("failed to save scheduler state for %s", learner_id)
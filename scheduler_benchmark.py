@@ -0,0 +1,95 @@
+"""
+Benchmark for the spaced-repetition scheduler.
+
+Builds a synthetic lexicon and learner population, simulates review history,
+then measures ``next_phrase`` and ``record`` latency and the memory held per
+learner.
+
+Usage:
+    python scheduler_benchmark.py --learners 20000 --items 10000 --ops 200000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from scheduler import DAY, SpacedRepetitionScheduler
+
+
+def build_lexicon(items: int, senses_per_item: int):
+    return {
+        f"ITEM {i}": [
+            {"senseNumber": n + 1, "definition": f"sense {n + 1}", "examples": [f"example {n + 1}"]}
+            for n in range(senses_per_item)
+        ]
+        for i in range(items)
+    }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def report(name, samples_ns):
+    print(
+        f"  {name:<12} p50 {percentile(samples_ns, 0.5) / 1000:7.2f} us"
+        f"   p99 {percentile(samples_ns, 0.99) / 1000:7.2f} us"
+        f"   mean {statistics.fmean(samples_ns) / 1000:7.2f} us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark scheduler selection latency.")
+    parser.add_argument("--learners", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--senses", type=int, default=2, help="senses per item")
+    parser.add_argument("--history", type=int, default=50, help="items already studied per learner")
+    parser.add_argument("--ops", type=int, default=100000, help="timed select+record operations")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lexicon = build_lexicon(args.items, args.senses)
+    now = 0.0
+    scheduler = SpacedRepetitionScheduler(lexicon, clock=lambda: now)
+    learners = [f"learner-{i}" for i in range(args.learners)]
+
+    print(f"Warming up {args.learners} learners x {args.history} studied items "
+          f"({args.items} items, {args.senses} senses each)...")
+    tracemalloc.start()
+    started = time.perf_counter()
+    for learner in learners:
+        for _ in range(args.history):
+            phrase = scheduler.next_phrase(learner, now)
+            for sense in range(1, args.senses + 1):
+                scheduler.record(learner, phrase, sense, correct=rng.random() < 0.8, now=now)
+            now += rng.uniform(0, DAY / args.history)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  warm-up took {time.perf_counter() - started:.1f}s, "
+          f"{memory / args.learners / 1024:.1f} KiB per learner")
+
+    select_ns, record_ns = [], []
+    for _ in range(args.ops):
+        learner = rng.choice(learners)
+        now += rng.uniform(0, 60)
+
+        t0 = time.perf_counter_ns()
+        phrase = scheduler.next_phrase(learner, now)
+        t1 = time.perf_counter_ns()
+        scheduler.record(learner, phrase, rng.randint(1, args.senses), correct=rng.random() < 0.8, now=now)
+        t2 = time.perf_counter_ns()
+
+        select_ns.append(t1 - t0)
+        record_ns.append(t2 - t1)
+
+    print(f"\n{args.ops} operations over {args.learners} learners:")
+    report("next_phrase", select_ns)
+    report("record", record_ns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Session checkpoints, so a learner can resume mid-exercise on any worker.
+
+A ``SessionCheckpointer`` snapshots the active agent's class name, the
+session's userdata (``MySessionInfo``, including which senses have been
+explained) and a compacted copy of the chat history every time the agent
+finishes a turn and goes back to listening. Snapshots are keyed by room name
+and written to a ``SessionStore`` off the voice loop; when a job starts in a
+room that has a checkpoint, the entrypoint rebuilds that agent from it
+instead of starting at the host.
+
+Backends:
+- ``InMemorySessionStore``: per-process, for development and tests
+- ``SQLiteSessionStore``: a single file, as a local stand-in for a shared store
+
+Set ``SESSION_STORE_PATH`` to use SQLite; otherwise checkpoints live in memory
+and only survive as long as the worker process. Checkpoints older than
+``SESSION_CHECKPOINT_TTL`` seconds (default 30 minutes) are ignored and
+removed on load, and a session's checkpoint is deleted as soon as its exercise
+ends (``finish_session``) so a later job in the room starts fresh.
+
+The same backends, through ``get_learner_store``, keep each learner's
+spaced-repetition state between sessions for ``scheduler``.
+"""
+
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import sqlite3
+import time
+import weakref
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Most recent chat items kept in a checkpoint; enough for the short exercises
+MAX_HISTORY_ITEMS = 40
+
+# Seconds after its last write that a checkpoint is still worth resuming
+CHECKPOINT_TTL = 30 * 60
+
+RESUME_INSTRUCTIONS = (
+    "The session was briefly interrupted and has just reconnected. In the user's native language, "
+    "tell them very quickly that you are back, then continue the exercise exactly where it left off."
+)
+
+
+@dataclass
+class SessionCheckpoint:
+    """Everything needed to rebuild a session's active agent."""
+    key: str
+    agent: str
+    userdata: Dict[str, Any]
+    chat_items: List[Dict[str, Any]] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+    def chat_ctx(self):
+        """The checkpointed history as a ChatContext."""
+        from livekit.agents import ChatContext
+        return ChatContext.from_dict({"items": self.chat_items})
+
+    def expired(self, ttl: float, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.time()) - self.updated_at > ttl
+
+    def to_json(self) -> str:
+        return json.dumps(dataclasses.asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> "SessionCheckpoint":
+        return cls(**json.loads(data))
+
+
+class SessionStore(ABC):
+    """Where checkpoints are kept; implementations must be safe to call from any session."""
+
+    @abstractmethod
+    async def load(self, key: str) -> Optional[SessionCheckpoint]:
+        ...
+
+    @abstractmethod
+    async def save(self, checkpoint: SessionCheckpoint) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Checkpoints in a dict, stored serialized so they round-trip like a real backend."""
+
+    def __init__(self, ttl: float = CHECKPOINT_TTL) -> None:
+        self.ttl = ttl
+        self._checkpoints: Dict[str, str] = {}
+
+    async def load(self, key: str) -> Optional[SessionCheckpoint]:
+        data = self._checkpoints.get(key)
+        if data is None:
+            return None
+        checkpoint = SessionCheckpoint.from_json(data)
+        if checkpoint.expired(self.ttl):
+            del self._checkpoints[key]
+            return None
+        return checkpoint
+
+    async def save(self, checkpoint: SessionCheckpoint) -> None:
+        self._checkpoints[checkpoint.key] = checkpoint.to_json()
+
+    async def delete(self, key: str) -> None:
+        self._checkpoints.pop(key, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Checkpoints in a SQLite file; queries run in a thread to keep the event loop free."""
+
+    def __init__(self, path: str, ttl: float = CHECKPOINT_TTL) -> None:
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "key TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def _load(self, key: str) -> Optional[SessionCheckpoint]:
+        with self._connect() as conn:
+            # Clear out stale checkpoints, this one included, rather than resume them
+            conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (time.time() - self.ttl,))
+            row = conn.execute("SELECT data FROM checkpoints WHERE key = ?", (key,)).fetchone()
+        return SessionCheckpoint.from_json(row[0]) if row else None
+
+    def _save(self, checkpoint: SessionCheckpoint) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (key, data, updated_at) VALUES (?, ?, ?)",
+                (checkpoint.key, checkpoint.to_json(), checkpoint.updated_at),
+            )
+
+    def _delete(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+
+    async def load(self, key: str) -> Optional[SessionCheckpoint]:
+        return await asyncio.to_thread(self._load, key)
+
+    async def save(self, checkpoint: SessionCheckpoint) -> None:
+        await asyncio.to_thread(self._save, checkpoint)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+
+def compact_history(chat_ctx) -> List[Dict[str, Any]]:
+    """The chat history worth restoring: the last messages, without tool calls, instructions or media.
+
+    Instructions come from the restored agent itself, and per-item context is
+    re-added by its ``on_enter``.
+    """
+    compacted = chat_ctx.copy(exclude_function_call=True, exclude_instructions=True)
+    items = compacted.to_dict(exclude_image=True, exclude_audio=True)["items"]
+    return items[-MAX_HISTORY_ITEMS:]
+
+
+_checkpointers: "weakref.WeakKeyDictionary[Any, SessionCheckpointer]" = weakref.WeakKeyDictionary()
+
+
+class SessionCheckpointer:
+    """Writes a session's checkpoint at every turn boundary until its exercise ends."""
+
+    def __init__(self, session, store: SessionStore, key: str) -> None:
+        self.session = session
+        self.store = store
+        self.key = key
+        self.finished = False
+        self._pending: Optional[SessionCheckpoint] = None
+        self._task: Optional[asyncio.Task] = None
+        _checkpointers[session] = self
+        session.on("agent_state_changed", self._on_agent_state_changed)
+        session.on("close", self._on_close)
+
+    def snapshot(self) -> Optional[SessionCheckpoint]:
+        """Capture the session's current state, or None if there is nothing to resume."""
+        agent = self.session.current_agent
+        try:
+            userdata = self.session.userdata
+        except ValueError:
+            return None
+        return SessionCheckpoint(
+            key=self.key,
+            agent=type(agent).__name__,
+            userdata=dataclasses.asdict(userdata),
+            chat_items=compact_history(agent.chat_ctx),
+        )
+
+    def _on_agent_state_changed(self, ev) -> None:
+        if self.finished or ev.new_state != "listening":
+            return
+        checkpoint = self.snapshot()
+        if checkpoint is None:
+            return
+        # Only the latest snapshot matters; one write at a time per session
+        self._pending = checkpoint
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._write())
+
+    async def _write(self) -> None:
+        while self._pending is not None:
+            checkpoint, self._pending = self._pending, None
+            try:
+                await self.store.save(checkpoint)
+            except Exception:
+                logger.exception("failed to checkpoint session %s", self.key)
+
+    def finish(self) -> None:
+        """The exercise is over: stop checkpointing and delete the stored checkpoint."""
+        if self.finished:
+            return
+        self.finished = True
+        self._pending = None
+        asyncio.create_task(self._delete())
+
+    def _on_close(self, ev) -> None:
+        # A session the user ended is finished; anything else (shutdown, crash, drop) may come back
+        if getattr(ev.reason, "value", ev.reason) in ("user_initiated", "task_completed"):
+            self.finish()
+
+    async def _delete(self) -> None:
+        if self._task is not None:
+            await self._task  # don't let an in-flight write recreate the checkpoint
+        try:
+            await self.store.delete(self.key)
+        except Exception:
+            logger.exception("failed to delete checkpoint for session %s", self.key)
+
+
+def finish_session(session) -> None:
+    """Mark ``session``'s exercise as ended, e.g. from a tool; a no-op without a checkpointer."""
+    checkpointer = _checkpointers.get(session)
+    if checkpointer is not None:
+        checkpointer.finish()
+
+
+_store: Optional[SessionStore] = None
+
+
+def get_store() -> SessionStore:
+    """The checkpoint store for this worker process, chosen from SESSION_STORE_PATH."""
+    global _store
+    if _store is None:
+        path = os.getenv("SESSION_STORE_PATH")
+        ttl = float(os.getenv("SESSION_CHECKPOINT_TTL", CHECKPOINT_TTL))
+        if path:
+            _store = SQLiteSessionStore(path, ttl=ttl)
+        else:
+            # Each job is its own process, so in-memory checkpoints are gone before anything could resume them
+            logger.warning("SESSION_STORE_PATH is not set; session checkpoints are in memory and will never resume")
+            _store = InMemorySessionStore(ttl=ttl)
+    return _store
+
+
+class LearnerStore(ABC):
+    """Where learners' spaced-repetition state is kept between sessions."""
+
+    @abstractmethod
+    async def load(self, learner_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def save(self, learner_id: str, state: Dict[str, Any]) -> None:
+        ...
+
+
+class InMemoryLearnerStore(LearnerStore):
+    """Learner state in a dict, stored serialized so it round-trips like a real backend."""
+
+    def __init__(self) -> None:
+        self._states: Dict[str, str] = {}
+
+    async def load(self, learner_id: str) -> Optional[Dict[str, Any]]:
+        data = self._states.get(learner_id)
+        return json.loads(data) if data is not None else None
+
+    async def save(self, learner_id: str, state: Dict[str, Any]) -> None:
+        self._states[learner_id] = json.dumps(state)
+
+
+class SQLiteLearnerStore(LearnerStore):
+    """Learner state in a SQLite file, next to the checkpoints; queries run in a thread."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS learners ("
+                "learner_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def _load(self, learner_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM learners WHERE learner_id = ?", (learner_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save(self, learner_id: str, state: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO learners (learner_id, data, updated_at) VALUES (?, ?, ?)",
+                (learner_id, json.dumps(state), time.time()),
+            )
+
+    async def load(self, learner_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._load, learner_id)
+
+    async def save(self, learner_id: str, state: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._save, learner_id, state)
+
+
+_learner_store: Optional[LearnerStore] = None
+
+
+def get_learner_store() -> LearnerStore:
+    """The learner state store for this process, chosen from SESSION_STORE_PATH."""
+    global _learner_store
+    if _learner_store is None:
+        path = os.getenv("SESSION_STORE_PATH")
+        if path:
+            _learner_store = SQLiteLearnerStore(path)
+        else:
+            logger.warning("SESSION_STORE_PATH is not set; learner schedules are in memory and will not persist")
+            _learner_store = InMemoryLearnerStore()
+    return _learner_store
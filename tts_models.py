@@ -0,0 +1,144 @@
+"""
+ElevenLabs TTS model index and request chunking.
+
+``elevelabs_models_07_24.json`` is a snapshot of the ElevenLabs models API. It
+is loaded once per process into an index by language and capability, so that
+``select_model`` can pick the fastest or cheapest model that speaks a turn's
+language, and ``split_text`` can keep each request under that model's
+``maximum_text_length_per_request``.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+# Voice IDs for the two dialogue speakers
+VOICE_IDS = {
+    "A": "21m00Tcm4TlvDq8ikWAM",  # Replace with your preferred voice ID
+    "B": "TX3LPaxmHKxFdv7VOQHJ"   # Replace with your preferred voice ID
+}
+
+MODELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "elevelabs_models_07_24.json")
+
+# Sentence ends, followed by whitespace
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+")
+
+
+@dataclass(frozen=True)
+class TTSModel:
+    """The fields of one ElevenLabs model that matter for selection."""
+    model_id: str
+    languages: FrozenSet[str]
+    capabilities: FrozenSet[str]
+    cost_factor: float
+    max_text_length: int
+    low_latency: bool
+
+    @property
+    def speed_rank(self) -> int:
+        """Lower is faster: Flash, then the other low-latency (turbo) models, then the rest."""
+        if "flash" in self.model_id:
+            return 0
+        return 1 if self.low_latency else 2
+
+
+class TTSModelIndex:
+    """Text-to-speech models indexed by language and by capability."""
+
+    def __init__(self, models: Iterable[TTSModel]) -> None:
+        self.models: Dict[str, TTSModel] = {}
+        self.by_language: Dict[str, List[TTSModel]] = {}
+        self.by_capability: Dict[str, FrozenSet[str]] = {}
+        capability_ids: Dict[str, set] = {}
+        for model in models:
+            self.models[model.model_id] = model
+            for language in model.languages:
+                self.by_language.setdefault(language, []).append(model)
+            for capability in model.capabilities:
+                capability_ids.setdefault(capability, set()).add(model.model_id)
+        self.by_capability = {name: frozenset(ids) for name, ids in capability_ids.items()}
+
+    def select(self, language: str, prefer: str = "fast", capabilities: Tuple[str, ...] = ()) -> TTSModel:
+        """Pick the fastest or cheapest model supporting ``language`` and ``capabilities``.
+
+        Args:
+            language: ISO 639-1 code, e.g. "en" or "es"
+            prefer: "fast" or "cheap"; the other criterion breaks ties
+            capabilities: Required flags without the "can_" prefix, e.g. ("use_style",)
+
+        Raises:
+            ValueError: If no model matches
+        """
+        candidates = self.by_language.get(language.split("-")[0], [])
+        for capability in capabilities:
+            allowed = self.by_capability.get(capability, frozenset())
+            candidates = [m for m in candidates if m.model_id in allowed]
+        if not candidates:
+            raise ValueError(f"No ElevenLabs model supports language {language!r} with {capabilities}")
+
+        if prefer == "fast":
+            key = lambda m: (m.speed_rank, m.cost_factor, -m.max_text_length)
+        elif prefer == "cheap":
+            key = lambda m: (m.cost_factor, m.speed_rank, -m.max_text_length)
+        else:
+            raise ValueError(f"Unknown model preference: {prefer}")
+        return min(candidates, key=key)
+
+
+def _parse_model(data: Dict) -> TTSModel:
+    return TTSModel(
+        model_id=data["model_id"],
+        languages=frozenset(lang["language_id"] for lang in data["languages"]),
+        capabilities=frozenset(
+            key[len("can_"):] for key, value in data.items() if key.startswith("can_") and value is True
+        ),
+        cost_factor=data["token_cost_factor"] * data.get("model_rates", {}).get("character_cost_multiplier", 1),
+        max_text_length=data["maximum_text_length_per_request"],
+        low_latency=data.get("concurrency_group") == "turbo",
+    )
+
+
+@lru_cache(maxsize=None)
+def load_model_index(path: str = MODELS_PATH) -> TTSModelIndex:
+    """Load and index the models file once; later calls return the cached index."""
+    with open(path) as f:
+        models = [_parse_model(m) for m in json.load(f)]
+    # Speech-to-speech models are listed too; only text-to-speech ones can be selected
+    return TTSModelIndex(m for m in models if "do_text_to_speech" in m.capabilities)
+
+
+def select_model(language: str, prefer: str = "fast", capabilities: Tuple[str, ...] = ()) -> TTSModel:
+    """Shortcut for ``load_model_index().select(...)``."""
+    return load_model_index().select(language, prefer, capabilities)
+
+
+def split_text(text: str, max_length: int) -> List[str]:
+    """Split text into chunks of at most ``max_length`` characters at sentence boundaries.
+
+    Sentences longer than the limit are split at the last space that fits,
+    or hard-split if there is none.
+    """
+    if len(text) <= max_length:
+        return [text]
+
+    pieces = []
+    for sentence in _SENTENCE_BOUNDARY.split(text):
+        while len(sentence) > max_length:
+            cut = sentence.rfind(" ", 0, max_length + 1)
+            if cut <= 0:
+                cut = max_length
+            pieces.append(sentence[:cut].rstrip())
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_length:
+            chunks[-1] += " " + piece
+        else:
+            chunks.append(piece)
+    return chunks
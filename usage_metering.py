@@ -0,0 +1,239 @@
+"""
+Per-session usage metering, aggregated per worker off the voice loop.
+
+Each session gets a ``SessionMeter`` whose counters are plain Python numbers
+updated from session events. Every update runs on the session's event loop
+and only touches that session's buffer, so no locks are needed. Every
+``interval`` seconds the worker's ``UsageAggregator`` swaps each buffer for an
+empty one, merges the old buffers into worker totals and exports the interval
+as an OpenTelemetry span on the tracer provider from ``setup_langfuse``.
+
+Counted per session:
+- STT audio seconds
+- TTS characters, per provider and voice, including TTS used outside the
+  agent pipeline (live dialogue voices) through ``SessionMeter.watch_tts``
+- LLM input, output and cached input tokens, per agent, and the share of
+  input served from the provider's prompt cache
+- function tool invocations, per tool
+"""
+
+import asyncio
+import logging
+import weakref
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from prompts.assembly import prefix_fingerprints
+from provider_router import provider_from_label
+from providers import tts_voice
+
+logger = logging.getLogger(__name__)
+
+# List prices from research/livekit_cost_comparison.md, used to turn usage
+# into an estimated cost. Adjust when providers or contracts change.
+DEFAULT_PRICES = {
+    "stt_per_minute": 0.0043,         # Deepgram Nova at volume
+    "tts_per_million_chars": 16.0,    # Google Cloud TTS, and any provider not priced below
+    "llm_per_1k_tokens": 0.002,       # OpenAI, input and output alike
+}
+
+# TTS list prices per million characters by provider, from the same comparison
+TTS_PRICES = {
+    "google": 16.0,
+    "cartesia": 33.0,
+    "elevenlabs": 180.0,  # low end of the quoted $180-300
+}
+
+
+@dataclass
+class UsageCounters:
+    """Usage counts for one session, interval, or the worker total."""
+    stt_audio_seconds: float = 0.0
+    tts_characters: Counter = field(default_factory=Counter)     # "provider.voice" -> characters
+    llm_input_tokens: Counter = field(default_factory=Counter)   # agent -> tokens
+    llm_output_tokens: Counter = field(default_factory=Counter)
+    llm_cached_tokens: Counter = field(default_factory=Counter)
+    tool_calls: Counter = field(default_factory=Counter)         # tool -> invocations
+
+    def merge(self, other: "UsageCounters") -> None:
+        self.stt_audio_seconds += other.stt_audio_seconds
+        self.tts_characters.update(other.tts_characters)
+        self.llm_input_tokens.update(other.llm_input_tokens)
+        self.llm_output_tokens.update(other.llm_output_tokens)
+        self.llm_cached_tokens.update(other.llm_cached_tokens)
+        self.tool_calls.update(other.tool_calls)
+
+    def estimated_cost(
+        self, prices: Dict[str, float] = DEFAULT_PRICES, tts_prices: Dict[str, float] = TTS_PRICES
+    ) -> float:
+        """Estimated USD cost of this usage at the given list prices; TTS is priced by provider."""
+        tokens = sum(self.llm_input_tokens.values()) + sum(self.llm_output_tokens.values())
+        tts_cost = sum(
+            count / 1_000_000 * tts_prices.get(key.split(".", 1)[0], prices["tts_per_million_chars"])
+            for key, count in self.tts_characters.items()
+        )
+        return (
+            self.stt_audio_seconds / 60 * prices["stt_per_minute"]
+            + tts_cost
+            + tokens / 1000 * prices["llm_per_1k_tokens"]
+        )
+
+    def to_attributes(self, prefix: str = "usage") -> Dict[str, float]:
+        """Flatten into span attributes, e.g. 'usage.llm.NativeExplainAgent.input_tokens'."""
+        attributes = {f"{prefix}.stt.audio_seconds": self.stt_audio_seconds}
+        for voice, count in self.tts_characters.items():
+            attributes[f"{prefix}.tts.{voice}.characters"] = count
+        for name, counter in (
+            ("input_tokens", self.llm_input_tokens),
+            ("output_tokens", self.llm_output_tokens),
+            ("cached_tokens", self.llm_cached_tokens),
+        ):
+            for agent, count in counter.items():
+                attributes[f"{prefix}.llm.{agent}.{name}"] = count
+        for agent, count in self.llm_input_tokens.items():
+            if count:
+                attributes[f"{prefix}.llm.{agent}.cached_ratio"] = self.llm_cached_tokens[agent] / count
+        for tool, count in self.tool_calls.items():
+            attributes[f"{prefix}.tool.{tool}.calls"] = count
+        attributes[f"{prefix}.estimated_cost_usd"] = self.estimated_cost()
+        return attributes
+
+
+class SessionMeter:
+    """Collects one session's usage from its AgentSession events."""
+
+    def __init__(self, session, session_id: str) -> None:
+        self.session_id = session_id
+        self._session = session
+        self._buffer = UsageCounters()
+        self.closed = False
+        self._watched_tts: "weakref.WeakSet" = weakref.WeakSet()
+        session.on("metrics_collected", self._on_metrics)
+        session.on("function_tools_executed", self._on_tools_executed)
+        session.on("close", self._on_close)
+
+    def swap(self) -> UsageCounters:
+        """Return the counters collected so far and start a fresh buffer."""
+        buffer, self._buffer = self._buffer, UsageCounters()
+        return buffer
+
+    def _agent_name(self) -> str:
+        agent = getattr(self._session, "current_agent", None)
+        return type(agent).__name__ if agent is not None else "unknown"
+
+    def _tts_voice(self) -> Optional[str]:
+        agent = getattr(self._session, "current_agent", None)
+        return tts_voice(agent.tts) if agent is not None and agent.tts is not None else None
+
+    def _count_tts(self, m, voice: Optional[str]) -> None:
+        # The label names the plugin that actually synthesized, even behind a FallbackAdapter
+        provider = provider_from_label(m.label)
+        voice = voice or m.label
+        self._buffer.tts_characters[f"{provider}.{voice}" if provider else voice] += m.characters_count
+
+    def watch_tts(self, tts) -> None:
+        """Meter a TTS used outside the agent pipeline, e.g. a live dialogue voice."""
+        if tts in self._watched_tts:
+            return
+        self._watched_tts.add(tts)
+        voice = tts_voice(tts)
+        tts.on("metrics_collected", lambda m: self._count_tts(m, voice))
+
+    def _on_metrics(self, ev) -> None:
+        m = ev.metrics
+        if m.type == "stt_metrics":
+            self._buffer.stt_audio_seconds += m.audio_duration
+        elif m.type == "tts_metrics":
+            self._count_tts(m, self._tts_voice())
+        elif m.type == "llm_metrics":
+            agent = self._agent_name()
+            self._buffer.llm_input_tokens[agent] += m.prompt_tokens
+            self._buffer.llm_output_tokens[agent] += m.completion_tokens
+            self._buffer.llm_cached_tokens[agent] += m.prompt_cached_tokens
+
+    def _on_tools_executed(self, ev) -> None:
+        for call in ev.function_calls:
+            self._buffer.tool_calls[call.name] += 1
+
+    def _on_close(self, ev) -> None:
+        self.closed = True
+
+
+class UsageAggregator:
+    """Merges every session's usage into worker totals on a background interval."""
+
+    def __init__(self, interval: float = 30.0) -> None:
+        self.interval = interval
+        self.totals = UsageCounters()
+        self._meters: List[SessionMeter] = []
+        self._tracer = None
+        self._tracer_provider = None
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self, session, session_id: str) -> SessionMeter:
+        """Start metering an AgentSession; call before ``session.start``."""
+        meter = SessionMeter(session, session_id)
+        self._meters.append(meter)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return meter
+
+    def meter_for(self, session) -> Optional[SessionMeter]:
+        """The meter attached to ``session``, if any."""
+        for meter in self._meters:
+            if meter._session is session:
+                return meter
+        return None
+
+    def set_tracer_provider(self, tracer_provider) -> None:
+        """Export through this provider (e.g. the one returned by setup_langfuse)."""
+        self._tracer_provider = tracer_provider
+        self._tracer = tracer_provider.get_tracer(__name__)
+
+    def flush(self) -> UsageCounters:
+        """Merge all session buffers into the totals and export the interval."""
+        interval = UsageCounters()
+        for meter in self._meters:
+            usage = meter.swap()
+            interval.merge(usage)
+            self._export("usage.session", usage, {"session.id": meter.session_id})
+        self._meters = [meter for meter in self._meters if not meter.closed]
+        self.totals.merge(interval)
+        # Which stable prompt prefixes this worker sent, to tell prompt changes apart from cache misses
+        self._export("usage.worker", interval, {
+            f"prompt.prefix.{name}": fingerprint for name, fingerprint in prefix_fingerprints().items()
+        })
+        return interval
+
+    async def shutdown(self) -> None:
+        """Export the final interval and push out buffered spans; register as a job shutdown callback.
+
+        Jobs exit when their session closes, so without this the last interval,
+        and all of a session shorter than ``interval``, would be lost.
+        """
+        self.flush()
+        if self._tracer_provider is not None:
+            await asyncio.to_thread(self._tracer_provider.force_flush)
+
+    def _export(self, name: str, usage: UsageCounters, extra: Dict[str, str]) -> None:
+        if self._tracer is None or usage == UsageCounters():
+            return
+        with self._tracer.start_as_current_span(name) as span:
+            span.set_attributes({**extra, **usage.to_attributes()})
+
+    async def _run(self) -> None:
+        while self._meters:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("failed to export usage")
+
+
+_aggregator = UsageAggregator()
+
+
+def get_aggregator() -> UsageAggregator:
+    """The aggregator shared by every session in this worker process."""
+    return _aggregator
@@ -0,0 +1,98 @@
+"""
+VAD-gated speech-to-text input.
+
+By default the STT stream receives every microphone frame, including long
+silences such as while ``play_dialogue`` is playing, and all of it is uploaded
+and billed. With ``STT_VAD_GATE=1`` agents run their STT input through
+``gate_audio``: Silero VAD decides when frames reach the STT stream, and a ring
+buffer of the last few hundred milliseconds is replayed on speech onset so the
+first syllable is not clipped. Frames keep flowing until Silero reports end of
+speech, which already includes its trailing-silence window, so the STT still
+sees the pause it needs to finalize. The STT connection itself stays open
+(Deepgram's plugin sends keepalives) and simply idles during silence.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import AsyncIterable, AsyncIterator, Deque
+
+from livekit import rtc
+from livekit.agents import Agent, vad
+
+logger = logging.getLogger(__name__)
+
+PREROLL_MS = 300
+
+
+def stt_vad_gate_enabled() -> bool:
+    return os.getenv("STT_VAD_GATE") == "1"
+
+
+async def gate_audio(
+    audio: AsyncIterable[rtc.AudioFrame], vad_model: vad.VAD, preroll_ms: int = PREROLL_MS
+) -> AsyncIterator[rtc.AudioFrame]:
+    """Yield only the frames that belong to speech, plus ``preroll_ms`` before each onset.
+
+    Args:
+        audio: Microphone frames, as given to ``Agent.stt_node``
+        vad_model: VAD used to detect speech (e.g. the agent's Silero VAD)
+        preroll_ms: Audio replayed from before the detected speech start
+    """
+    vad_stream = vad_model.stream()
+    speaking = False
+
+    async def watch_vad() -> None:
+        nonlocal speaking
+        async for ev in vad_stream:
+            if ev.type == vad.VADEventType.START_OF_SPEECH:
+                speaking = True
+            elif ev.type == vad.VADEventType.END_OF_SPEECH:
+                speaking = False
+
+    watch_task = asyncio.create_task(watch_vad())
+    preroll: Deque[rtc.AudioFrame] = deque()
+    preroll_seconds = 0.0
+    passed_seconds = 0.0
+    gated_seconds = 0.0
+    try:
+        async for frame in audio:
+            vad_stream.push_frame(frame)
+            if speaking:
+                while preroll:
+                    yield preroll.popleft()
+                preroll_seconds = 0.0
+                passed_seconds += frame.duration
+                yield frame
+                continue
+
+            preroll.append(frame)
+            preroll_seconds += frame.duration
+            while preroll_seconds > preroll_ms / 1000 and len(preroll) > 1:
+                dropped = preroll.popleft()
+                preroll_seconds -= dropped.duration
+                gated_seconds += dropped.duration
+    finally:
+        watch_task.cancel()
+        await vad_stream.aclose()
+        total = passed_seconds + gated_seconds
+        if total:
+            logger.info(
+                "STT VAD gate: streamed %.1fs of %.1fs (%.0f%% held back)",
+                passed_seconds, total, gated_seconds / total * 100,
+            )
+
+
+class VADGatedSTTMixin:
+    """Agent mixin that gates STT input with the agent's VAD when STT_VAD_GATE=1.
+
+    Put it before ``Agent`` in the bases: ``class MyAgent(VADGatedSTTMixin, Agent)``.
+    """
+
+    async def stt_node(self, audio, model_settings):
+        vad_model = self.vad or self.session.vad
+        if stt_vad_gate_enabled() and vad_model is not None:
+            audio = gate_audio(audio, vad_model)
+        async for event in Agent.default.stt_node(self, audio, model_settings):
+            yield event